@@ -2,10 +2,22 @@
 import httpx
 import requests
 import time
+import random
 import asyncio
-from typing import Any, Dict, Optional, Callable, Awaitable
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Callable, Awaitable, AsyncIterator
 from datetime import datetime, timedelta
-from open_library.asynch.util import periodic_wrapper
+from functools import lru_cache
+from open_library.collections.dict import deserialize
+from open_library.api_client.metrics import LatencyRecorder, RequestTrace
+from open_library.api_client.rate_limiter import RateLimiter, TokenBucket
+from open_library.api_client.response_cache import ResponseCache
+from open_library.api_client.retry import RetryPolicy, CircuitBreakerRegistry
+from open_library.api_client.transport import (
+    TransportConfig,
+    TransportRegistry,
+    transport_registry,
+)
 
 import logging
 
@@ -19,13 +31,22 @@ httpcore_logger.setLevel(logging.WARNING)
 
 
 class TokenManager:
-    # periodic proactive token refreshing
+    # proactive token refreshing ahead of refresh_deadline,
+    # concurrent callers share one in-flight refresh
+    REFRESH_AHEAD_SEC = 300
+    # short lived tokens are refreshed after at least this part of their lifetime
+    MIN_LIFETIME_FRACTION = 0.5
+    MIN_REFRESH_WAIT_SEC = 1
+    RETRY_DELAY_SEC = 10
+
     def __init__(
         self,
         client: httpx.AsyncClient,
         token_url: str,
         client_id: str,
         client_secret: str,
+        refresh_jitter_sec: float = 30,
+        latency_recorder: LatencyRecorder | None = None,
     ):
         self.client = client
         self.token_url: str = token_url
@@ -34,24 +55,65 @@ class TokenManager:
         self.access_token: Optional[str] = None
         self.refresh_deadline: datetime = datetime.utcnow()
         self.expiry_time: datetime = datetime.utcnow()
+        self.refresh_jitter_sec = refresh_jitter_sec
         self.task = None
+        self.refresh_future: asyncio.Task | None = None
+        self.latency_recorder = latency_recorder
 
     def start_refresh_task(self):
-        PERIOD_CHECK_MIN = 60  # 1 hour
-
         if self.task is None:
-            self.task = asyncio.create_task(
-                periodic_wrapper(60 * PERIOD_CHECK_MIN, self.refresh_token)
+            self.task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            wait_sec = (self.refresh_deadline - datetime.utcnow()).total_seconds()
+            jitter = random.uniform(
+                0, min(self.refresh_jitter_sec, max(wait_sec, 0) / 2)
             )
+            if self.access_token is None:
+                await asyncio.sleep(max(wait_sec - jitter, 0))
+            else:
+                # never refresh back to back, e.g. on a token with expires_in of 0
+                await asyncio.sleep(max(wait_sec - jitter, self.MIN_REFRESH_WAIT_SEC))
+
+            try:
+                await self.refresh_token()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"background token refresh failed: {e}")
+                await asyncio.sleep(self.RETRY_DELAY_SEC)
 
     async def get_access_token(self, force_refresh=False) -> Optional[str]:
-        if self.is_near_expiration() or force_refresh:
+        if force_refresh or self.is_expired():
             await self.refresh_token()
+        elif self.is_near_expiration():
+            # old token is still valid, don't make the caller wait for the refresh
+            self._start_refresh()
+
         return self.access_token
 
+    def _start_refresh(self) -> asyncio.Task:
+        if self.refresh_future is None:
+            self.refresh_future = asyncio.create_task(self._refresh_token())
+            self.refresh_future.add_done_callback(self._on_refresh_done)
+
+        return self.refresh_future
+
+    def _on_refresh_done(self, task: asyncio.Task):
+        self.refresh_future = None
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"token refresh failed: {task.exception()}")
+
     async def refresh_token(self) -> None:
+        # shield, so a cancelled caller doesn't cancel the refresh others are waiting on
+        await asyncio.shield(self._start_refresh())
+
+    async def _refresh_token(self) -> None:
         headers = {"content-type": "application/x-www-form-urlencoded"}
 
+        started_at = time.perf_counter()
         response = await self.client.post(
             self.token_url,
             headers=headers,
@@ -62,6 +124,10 @@ class TokenManager:
                 "scope": "oob",
             },
         )
+        if self.latency_recorder is not None:
+            self.latency_recorder.record_url(
+                self.token_url, "token_refresh", time.perf_counter() - started_at
+            )
         data: Dict[str, Any] = response.json()
 
         new_token = data.get("access_token", None)
@@ -83,19 +149,40 @@ class TokenManager:
         self.expiry_time = self.token_acquired_at + timedelta(
             seconds=data["expires_in"]
         )
-        self.refresh_deadline = self.expiry_time - timedelta(seconds=300)
+        refresh_ahead_sec = min(
+            self.REFRESH_AHEAD_SEC,
+            data["expires_in"] * (1 - self.MIN_LIFETIME_FRACTION),
+        )
+        self.refresh_deadline = self.expiry_time - timedelta(seconds=refresh_ahead_sec)
 
     def stop_refreshing(self) -> None:
         # Call this method when you want to stop the automatic token refreshing.
         if self.task:
             self.task.cancel()
+            self.task = None
 
-    def is_near_expiration(self, threashold=300) -> bool:
+    def is_near_expiration(self, threashold=None) -> bool:
         if self.access_token is None:
             return True
 
+        if threashold is None:
+            return datetime.utcnow() >= self.refresh_deadline
         return datetime.utcnow() + timedelta(seconds=threashold) > self.expiry_time
 
+    def is_expired(self) -> bool:
+        if self.access_token is None:
+            return True
+
+        return datetime.utcnow() >= self.expiry_time
+
+
+@dataclass
+class RequestSpec:
+    url: str
+    method: str = "GET"
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    exchange_api_code: Any = None
+
 
 class ApiClient:
     # ebest doesn't have refresh token.. meantime we will use custom api client to handle token refresh
@@ -106,10 +193,24 @@ class ApiClient:
         client_secret: str,
         min_interval_sec: float = 0.5,
         should_refresh_token_func: Callable[[httpx.Response], bool] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        transport_config: TransportConfig | None = None,
+        registry: TransportRegistry | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+        response_cache: ResponseCache | None = None,
+        latency_recorder: LatencyRecorder | None = None,
     ):
-        self.client = httpx.AsyncClient(verify=False, timeout=10)
+        # clients with the same transport_config share a warm connection pool
+        self.registry = registry or transport_registry
+        self.client = self.registry.acquire(transport_config)
+        self.latency_recorder = latency_recorder
         self.token_manager = TokenManager(
-            self.client, token_url, client_id, client_secret
+            self.client,
+            token_url,
+            client_id,
+            client_secret,
+            latency_recorder=latency_recorder,
         )
 
         self.token_url: str = token_url
@@ -120,24 +221,131 @@ class ApiClient:
         self.last_request_time = None
         self.should_refresh_token_func = should_refresh_token_func
 
+        if rate_limiter is None:
+            global_bucket = (
+                TokenBucket.from_interval(min_interval_sec)
+                if min_interval_sec
+                else None
+            )
+            rate_limiter = RateLimiter(global_bucket)
+        self.rate_limiter = rate_limiter
+
+        # retries only apply to idempotent methods, see RetryPolicy.retry_methods
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breakers = circuit_breakers or CircuitBreakerRegistry()
+        self.response_cache = response_cache
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        retry_policy = self.retry_policy
+        circuit_breaker = self.circuit_breakers.get(httpx.URL(url).host)
+        retryable = retry_policy.is_retryable_method(method)
+
+        attempt = 0
+        while True:
+            circuit_breaker.before_request()
+
+            try:
+                response = await self._send_once(method, url, **kwargs)
+            except Exception as e:
+                if retry_policy.should_retry_exception(e):
+                    circuit_breaker.record_failure()
+                    if retryable and attempt < retry_policy.max_retries:
+                        delay = retry_policy.get_delay(attempt)
+                        logger.warning(
+                            f"retrying {method} {url} in {delay:.2f}s, attempt: {attempt}, {e!r}"
+                        )
+                        attempt += 1
+                        await asyncio.sleep(delay)
+                        continue
+                raise
+
+            if response.status_code >= 500:
+                circuit_breaker.record_failure()
+            else:
+                circuit_breaker.record_success()
+
+            if not (
+                retryable
+                and attempt < retry_policy.max_retries
+                and retry_policy.should_retry_response(response)
+            ):
+                return response
+
+            delay = retry_policy.get_delay(attempt, response)
+            logger.warning(
+                f"retrying {method} {url} in {delay:.2f}s, attempt: {attempt}, status: {response.status_code}"
+            )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _send_once(
+        self, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        latency_recorder = self.latency_recorder
+
+        queue_wait_sec = await self.rate_limiter.acquire(url)
+        self.last_request_time = time.monotonic()
+
+        if latency_recorder is None:
+            return await self.client.request(method, url, **kwargs)
+
+        latency_recorder.record_url(url, "queue_wait", queue_wait_sec)
+
+        trace = RequestTrace()
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = trace
+
+        started_at = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, url, extensions=extensions, **kwargs
+            )
+        except Exception as e:
+            latency_recorder.record_status(url, type(e).__name__)
+            raise
+
+        finished_at = time.perf_counter()
+        latency_recorder.record_trace(url, trace, finished_at)
+        latency_recorder.record_url(url, "send", finished_at - started_at)
+        latency_recorder.record_status(url, response.status_code)
+        return response
+
     async def request(
         self, url: str, method: str = "GET", **kwargs: Any
     ) -> httpx.Response:
-        # Proactive token refreshing
-        if self.token_manager.is_near_expiration():
-            await self.token_manager.refresh_token()
-
+        response_cache = self.response_cache
+        if response_cache is not None:
+            ttl_sec = response_cache.ttl_for(method, url)
+            if ttl_sec:
+                key = response_cache.make_key(method, url, kwargs)
+                if key is not None:
+                    return await response_cache.get_or_fetch(
+                        key, ttl_sec, lambda: self._request(url, method, **kwargs)
+                    )
+
+        return await self._request(url, method, **kwargs)
+
+    async def _request(
+        self, url: str, method: str = "GET", **kwargs: Any
+    ) -> httpx.Response:
+        # Proactive token refreshing happens inside get_access_token
+        started_at = time.perf_counter()
         access_token = await self.token_manager.get_access_token()
+        if self.latency_recorder is not None:
+            self.latency_recorder.record_url(
+                url, "token", time.perf_counter() - started_at
+            )
 
-        headers: Dict[str, str] = kwargs.get("headers", {})
+        headers: Dict[str, str] = dict(kwargs.get("headers") or {})
         headers["Authorization"] = f"Bearer {access_token}"
         kwargs["headers"] = headers
 
-        response = await self.client.request(method, url, **kwargs)
+        response = await self._send(method, url, **kwargs)
 
         # Reactive token refreshing
         if response.status_code != 200:
-            logger.warning(f"no good {response.status_code}, {response.json()}")
+            # don't parse the body just to log it
+            logger.warning(f"no good {response.status_code}, {response.text[:500]}")
 
             if (
                 self.should_refresh_token_func is not None
@@ -148,15 +356,128 @@ class ApiClient:
                     force_refresh=True
                 )
                 headers["Authorization"] = f"Bearer {access_token}"
-                response = await self.client.request(method, url, **kwargs)
+                response = await self._send(method, url, **kwargs)
 
         return response
 
+    async def _request_spec(
+        self,
+        request_spec: RequestSpec,
+        response_handler: Callable[[httpx.Response, RequestSpec], "ApiResponse"],
+    ) -> "ApiResponse":
+        try:
+            response = await self.request(
+                request_spec.url, request_spec.method, **request_spec.kwargs
+            )
+            return response_handler(response, request_spec)
+        except Exception as e:
+            logger.warning(f"request failed, url: {request_spec.url}, {e!r}")
+            return ApiResponse.from_exception(e, request_spec.exchange_api_code)
+
+    def _create_request_tasks(
+        self,
+        request_specs: list[RequestSpec],
+        concurrency: int,
+        response_handler: Callable[[httpx.Response, RequestSpec], "ApiResponse"]
+        | None,
+    ) -> list[asyncio.Task]:
+        # every request still goes through the rate limiter in _send
+        semaphore = asyncio.Semaphore(concurrency)
+        response_handler = response_handler or ApiResponse.from_response
+
+        async def run(index: int, request_spec: RequestSpec):
+            async with semaphore:
+                api_response = await self._request_spec(
+                    request_spec, response_handler
+                )
+                return index, api_response
+
+        return [
+            asyncio.create_task(run(index, request_spec))
+            for index, request_spec in enumerate(request_specs)
+        ]
+
+    async def request_many(
+        self,
+        request_specs: list[RequestSpec],
+        concurrency: int = 8,
+        response_handler: Callable[[httpx.Response, RequestSpec], "ApiResponse"]
+        | None = None,
+    ) -> list["ApiResponse"]:
+        """
+        Run request_specs concurrently, results are in input order.
+        Errors are captured in ApiResponse(success=False) rather than raised.
+        """
+        tasks = self._create_request_tasks(
+            request_specs, concurrency, response_handler
+        )
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return [api_response for _, api_response in results]
+
+    async def iter_request_many(
+        self,
+        request_specs: list[RequestSpec],
+        concurrency: int = 8,
+        response_handler: Callable[[httpx.Response, RequestSpec], "ApiResponse"]
+        | None = None,
+    ) -> AsyncIterator[tuple[int, "ApiResponse"]]:
+        """
+        Yield (index, ApiResponse) as each request finishes.
+        """
+        tasks = self._create_request_tasks(
+            request_specs, concurrency, response_handler
+        )
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
     def get_token_manager(self):
         return self.token_manager
 
+    async def aclose(self) -> None:
+        self.token_manager.stop_refreshing()
+        if self.client is not None:
+            await self.registry.release(self.client)
+            self.client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    def get_rate_limit_stats(self) -> dict:
+        return self.rate_limiter.get_stats()
+
+    def get_latency_snapshot(self, reset: bool = False) -> dict:
+        if self.latency_recorder is None:
+            return {}
+        return self.latency_recorder.snapshot(reset=reset)
+
+    def get_cache_stats(self) -> dict:
+        if self.response_cache is None:
+            return {}
+        return self.response_cache.get_stats()
+
+
+@lru_cache(maxsize=None)
+def _type_adapter(data_type):
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(data_type)
+
 
 class ApiResponse:
+    # raw_data can be given already parsed, or as the response body bytes (content),
+    # which are decoded on first access
     def __init__(
         self,
         success,
@@ -167,9 +488,11 @@ class ApiResponse:
         error_code=None,
         default_data_type=list,
         is_recoverable=True,
+        content: bytes | None = None,
     ):
         self.success = success
-        self.raw_data = raw_data
+        self._raw_data = raw_data
+        self.content = content
         self.headers = headers
         self.data_field_name = data_field_name
         self.error_code = error_code
@@ -177,10 +500,80 @@ class ApiResponse:
         self.exchange_api_code = exchange_api_code
         self.is_recoverable = is_recoverable
 
+    @classmethod
+    def from_response(cls, response: httpx.Response, request_spec: RequestSpec):
+        success = response.is_success
+        return cls(
+            success=success,
+            raw_data=None,
+            content=response.content,
+            headers=response.headers,
+            exchange_api_code=request_spec.exchange_api_code,
+            error_code=None if success else response.status_code,
+            is_recoverable=success or response.status_code >= 500,
+        )
+
+    @classmethod
+    def from_exception(cls, exception: Exception, exchange_api_code=None):
+        return cls(
+            success=False,
+            raw_data={"error": repr(exception)},
+            headers={},
+            exchange_api_code=exchange_api_code,
+            error_code=type(exception).__name__,
+            is_recoverable=isinstance(exception, httpx.TransportError),
+        )
+
+    @property
+    def raw_data(self):
+        if self._raw_data is None and self.content is not None:
+            try:
+                self._raw_data = deserialize(self.content) if self.content else {}
+            except ValueError as e:
+                logger.warning(f"invalid json response: {e}")
+                self._raw_data = {}
+
+        return self._raw_data
+
+    @raw_data.setter
+    def raw_data(self, raw_data):
+        self._raw_data = raw_data
+
     @property
     def data(self):
         return self.raw_data.get(self.data_field_name, self.default_data_type())
 
+    def decode_as(self, data_type):
+        """
+        Validate the whole body straight from bytes into data_type (pydantic model, TypedDict ..),
+        skips building the intermediate dict.
+        """
+        if self.content is not None:
+            return _type_adapter(data_type).validate_json(self.content)
+        return _type_adapter(data_type).validate_python(self.raw_data)
+
+    def data_as(self, data_type):
+        return _type_adapter(data_type).validate_python(self.data)
+
+    def data_columns(self, field_names: list[str] | None = None) -> dict[str, list]:
+        """
+        list of records in data as columns, e.g. {"price": [..], "volume": [..]}
+        """
+        records = self.data
+        if not records:
+            return {field_name: [] for field_name in field_names or []}
+
+        field_names = field_names or list(records[0].keys())
+        return {
+            field_name: [record.get(field_name) for record in records]
+            for field_name in field_names
+        }
+
+    def data_frame(self, field_names: list[str] | None = None):
+        import pandas as pd
+
+        return pd.DataFrame(self.data_columns(field_names))
+
     def to_dict(self, include_headers=False):
         result = dict(
             success=self.success,
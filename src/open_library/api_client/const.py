@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    Closed = "closed"
+    Open = "open"
+    HalfOpen = "half_open"
+
+
+class OverflowPolicy(str, Enum):
+    DropOldest = "drop_oldest"
+    Block = "block"
+    CoalesceLatest = "coalesce_latest"
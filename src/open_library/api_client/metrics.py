@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable
+
+import httpx
+
+from open_library.asynch.util import periodic_wrapper, wrap_func_in_coro
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _latency_bounds(min_sec=0.0001, max_sec=60.0, factor=1.25) -> list[float]:
+    bounds = []
+    bound = min_sec
+    while bound < max_sec:
+        bounds.append(bound)
+        bound *= factor
+    bounds.append(max_sec)
+    return bounds
+
+
+LATENCY_BOUNDS = _latency_bounds()
+
+
+class Histogram:
+    # fixed log-spaced buckets, recording is a bisect and an increment
+    def __init__(self, bounds: list[float] = LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # upper bound of the bucket, clamped by the observed max
+                if index >= len(self.bounds):
+                    return self.max
+                return min(self.bounds[index], self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        return dict(
+            count=self.count,
+            mean=self.total / self.count if self.count else 0.0,
+            min=self.min if self.count else 0.0,
+            max=self.max,
+            p50=self.percentile(0.5),
+            p90=self.percentile(0.9),
+            p99=self.percentile(0.99),
+        )
+
+
+class RequestTrace:
+    # httpcore trace callback, passed per request via extensions={"trace": ...}
+    CONNECT_EVENTS = ("connection.connect_tcp", "connection.start_tls")
+
+    def __init__(self):
+        self.started: dict[str, float] = {}
+        self.connect_sec = 0.0
+        self.send_started_at: float | None = None
+        self.headers_received_at: float | None = None
+
+    async def __call__(self, event_name: str, info: dict):
+        now = time.perf_counter()
+        name, _, status = event_name.rpartition(".")
+
+        if status == "started":
+            self.started[name] = now
+            if name.endswith("send_request_headers"):
+                self.send_started_at = now
+        elif status == "complete":
+            started_at = self.started.pop(name, now)
+            if name in self.CONNECT_EVENTS:
+                self.connect_sec += now - started_at
+            elif name.endswith("receive_response_headers"):
+                self.headers_received_at = now
+
+    @property
+    def ttfb_sec(self) -> float | None:
+        if self.send_started_at is None or self.headers_received_at is None:
+            return None
+        return self.headers_received_at - self.send_started_at
+
+
+class LatencyRecorder:
+    """
+    Per endpoint, per phase latency histograms and status code counters.
+    phases: queue_wait, token, token_refresh, connect, ttfb, read_body, send
+    """
+
+    def __init__(self, endpoint_key: Callable[[str], str] | None = None):
+        self.endpoint_key = endpoint_key or self.default_endpoint_key
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self.status_counts: dict[str, Counter] = {}
+        self.export_hooks: list[Callable[[dict], Any]] = []
+        self.export_task = None
+
+    @staticmethod
+    def default_endpoint_key(url: str) -> str:
+        return httpx.URL(url).path
+
+    def record(self, endpoint: str, phase: str, seconds: float):
+        histogram = self.histograms.get((endpoint, phase))
+        if histogram is None:
+            histogram = self.histograms[(endpoint, phase)] = Histogram()
+        histogram.record(seconds)
+
+    def record_url(self, url: str, phase: str, seconds: float):
+        self.record(self.endpoint_key(url), phase, seconds)
+
+    def record_trace(self, url: str, trace: RequestTrace, finished_at: float):
+        endpoint = self.endpoint_key(url)
+
+        self.record(endpoint, "connect", trace.connect_sec)
+        ttfb_sec = trace.ttfb_sec
+        if ttfb_sec is not None:
+            self.record(endpoint, "ttfb", ttfb_sec)
+        if trace.headers_received_at is not None:
+            self.record(endpoint, "read_body", finished_at - trace.headers_received_at)
+
+    def record_status(self, url: str, status_code: int | str):
+        endpoint = self.endpoint_key(url)
+        counter = self.status_counts.get(endpoint)
+        if counter is None:
+            counter = self.status_counts[endpoint] = Counter()
+        counter[status_code] += 1
+
+    def snapshot(self, reset: bool = False) -> dict:
+        result = {}
+        for (endpoint, phase), histogram in self.histograms.items():
+            result.setdefault(endpoint, {})[phase] = histogram.snapshot()
+        for endpoint, counter in self.status_counts.items():
+            result.setdefault(endpoint, {})["status"] = dict(counter)
+
+        if reset:
+            self.reset()
+        return result
+
+    def reset(self):
+        self.histograms = {}
+        self.status_counts = {}
+
+    def add_export_hook(self, hook: Callable[[dict], Any]):
+        self.export_hooks.append(wrap_func_in_coro(hook))
+
+    async def export(self, reset: bool = False):
+        snapshot = self.snapshot(reset=reset)
+        for hook in self.export_hooks:
+            try:
+                await hook(snapshot)
+            except Exception as e:
+                logger.exception(f"latency export hook failed: {e}")
+
+    def start_export_task(self, interval_sec: float, reset: bool = True):
+        if self.export_task is None:
+            self.export_task = asyncio.create_task(
+                periodic_wrapper(interval_sec, self.export, reset=reset)
+            )
+
+    def stop_export_task(self):
+        if self.export_task:
+            self.export_task.cancel()
+            self.export_task = None
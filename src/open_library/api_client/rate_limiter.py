@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from dataclasses import dataclass
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+THROTTLED_THRESHOLD_SEC = 0.001
+
+
+@dataclass
+class WaitStats:
+    count: int = 0
+    throttled_count: int = 0
+    total_wait_sec: float = 0.0
+    max_wait_sec: float = 0.0
+
+    def record(self, wait_sec: float):
+        self.count += 1
+        if wait_sec > THROTTLED_THRESHOLD_SEC:
+            self.throttled_count += 1
+        self.total_wait_sec += wait_sec
+        self.max_wait_sec = max(self.max_wait_sec, wait_sec)
+
+    @property
+    def mean_wait_sec(self) -> float:
+        if not self.count:
+            return 0.0
+        return self.total_wait_sec / self.count
+
+    def to_dict(self):
+        return dict(
+            count=self.count,
+            throttled_count=self.throttled_count,
+            total_wait_sec=self.total_wait_sec,
+            max_wait_sec=self.max_wait_sec,
+            mean_wait_sec=self.mean_wait_sec,
+        )
+
+
+class TokenBucket:
+    # callers wait on the lock in arrival order, so throttled requests are served fifo
+    def __init__(self, rate: float, capacity: float = 1):
+        if rate <= 0:
+            raise ValueError(f"rate should be positive: {rate}")
+
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.stats = WaitStats()
+
+    @classmethod
+    def from_interval(cls, interval_sec: float, capacity: float = 1):
+        return cls(rate=1 / interval_sec, capacity=capacity)
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1) -> float:
+        start_time = time.monotonic()
+
+        async with self.lock:
+            while True:
+                self._refill(time.monotonic())
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    break
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+        wait_sec = time.monotonic() - start_time
+        self.stats.record(wait_sec)
+        return wait_sec
+
+
+class RateLimiter:
+    # endpoint buckets are matched against the request url with fnmatch patterns,
+    # e.g. "*/quote*", every request also goes through the global bucket
+    def __init__(
+        self, global_bucket: TokenBucket | None = None, max_cached_urls: int = 1024
+    ):
+        self.global_bucket = global_bucket
+        self.endpoint_buckets: dict[str, TokenBucket] = {}
+        # lru, urls carry query strings so there is no bound on distinct ones
+        self._buckets_by_url: OrderedDict[str, list[TokenBucket]] = OrderedDict()
+        self.max_cached_urls = max_cached_urls
+        self.stats = WaitStats()
+
+    def add_endpoint_limit(self, pattern: str, rate: float, capacity: float = 1):
+        self.endpoint_buckets[pattern] = TokenBucket(rate, capacity)
+        self._buckets_by_url.clear()
+
+    def buckets_for(self, url: str) -> list[TokenBucket]:
+        buckets = self._buckets_by_url.get(url)
+        if buckets is not None:
+            self._buckets_by_url.move_to_end(url)
+        else:
+            buckets = [
+                bucket
+                for pattern, bucket in self.endpoint_buckets.items()
+                if fnmatchcase(url, pattern)
+            ]
+            # endpoint budgets first so a waiting request doesn't hold global tokens
+            if self.global_bucket is not None:
+                buckets.append(self.global_bucket)
+            self._buckets_by_url[url] = buckets
+            if len(self._buckets_by_url) > self.max_cached_urls:
+                self._buckets_by_url.popitem(last=False)
+        return buckets
+
+    async def acquire(self, url: str) -> float:
+        start_time = time.monotonic()
+
+        for bucket in self.buckets_for(url):
+            await bucket.acquire()
+
+        wait_sec = time.monotonic() - start_time
+        self.stats.record(wait_sec)
+        return wait_sec
+
+    def get_stats(self) -> dict:
+        result = dict(total=self.stats.to_dict())
+        if self.global_bucket is not None:
+            result["global"] = self.global_bucket.stats.to_dict()
+        for pattern, bucket in self.endpoint_buckets.items():
+            result[pattern] = bucket.stats.to_dict()
+        return result
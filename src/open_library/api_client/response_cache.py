@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import time
+import hashlib
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Awaitable, Callable, Hashable
+
+import httpx
+
+from open_library.collections.dict import hashable_json
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_KEY_FIELDS = ["params", "json", "data", "content"]
+
+
+@dataclass
+class CacheEntry:
+    response: httpx.Response
+    expires_at: float
+    size: int
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        if not total:
+            return 0.0
+        return (self.hits + self.coalesced) / total
+
+
+class ResponseCache:
+    # opt-in cache for read-only calls, only urls matching a route ttl are cached
+    # unless default_ttl_sec is set
+    def __init__(
+        self,
+        default_ttl_sec: float | None = None,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        cacheable_methods: frozenset[str] = frozenset(["GET"]),
+    ):
+        self.default_ttl_sec = default_ttl_sec
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cacheable_methods = cacheable_methods
+
+        self.route_ttls: dict[str, float] = {}
+        self.entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self.in_flight: dict[Hashable, asyncio.Task] = {}
+        self.current_bytes = 0
+        self.stats = CacheStats()
+
+    def add_route_ttl(self, pattern: str, ttl_sec: float):
+        self.route_ttls[pattern] = ttl_sec
+
+    def ttl_for(self, method: str, url: str) -> float | None:
+        if method.upper() not in self.cacheable_methods:
+            return None
+
+        for pattern, ttl_sec in self.route_ttls.items():
+            if fnmatchcase(url, pattern):
+                return ttl_sec
+        return self.default_ttl_sec
+
+    def make_key(
+        self, method: str, url: str, kwargs: dict[str, Any]
+    ) -> Hashable | None:
+        # headers are left out, they only carry the access token
+        # None when the body can't be keyed (e.g. a stream), the request then isn't cached
+        parts = []
+        for name in CACHE_KEY_FIELDS:
+            value = kwargs.get(name)
+            if isinstance(value, (bytes, bytearray)):
+                value = ["bytes", hashlib.sha256(value).hexdigest()]
+            parts.append(value)
+
+        try:
+            return (method.upper(), url, hashable_json(parts))
+        except (TypeError, ValueError):
+            return None
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        ttl_sec: float,
+        fetch: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.stats.hits += 1
+                return entry.response
+            self._remove(key)
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            task = asyncio.create_task(self._fetch(key, ttl_sec, fetch))
+            self.in_flight[key] = task
+
+        # shield, so one cancelled caller doesn't fail the others sharing the call
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        key: Hashable,
+        ttl_sec: float,
+        fetch: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        try:
+            response = await fetch()
+        finally:
+            del self.in_flight[key]
+
+        if response.is_success:
+            self._store(key, response, ttl_sec)
+        return response
+
+    def _store(self, key: Hashable, response: httpx.Response, ttl_sec: float):
+        size = len(response.content)
+        if size > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = CacheEntry(response, time.monotonic() + ttl_sec, size)
+        self.current_bytes += size
+
+        while (
+            len(self.entries) > self.max_entries or self.current_bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self.entries))
+            self._remove(oldest_key)
+            self.stats.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self.entries.pop(key)
+        self.current_bytes -= entry.size
+
+    def invalidate(self, pattern: str | None = None):
+        for key in list(self.entries):
+            _, url, _ = key
+            if pattern is None or fnmatchcase(url, pattern):
+                self._remove(key)
+
+    def get_stats(self) -> dict:
+        return dict(
+            hits=self.stats.hits,
+            misses=self.stats.misses,
+            coalesced=self.stats.coalesced,
+            evictions=self.stats.evictions,
+            hit_ratio=self.stats.hit_ratio,
+            entries=len(self.entries),
+            bytes=self.current_bytes,
+        )
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import time
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from open_library.api_client.const import CircuitState
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int = 3
+    initial_delay_sec: float = 0.5
+    max_delay_sec: float = 10
+    backoff_factor: float = 2
+    jitter: bool = True
+    max_retry_after_sec: float = 60
+    retry_methods: frozenset[str] = IDEMPOTENT_METHODS
+    retry_status_codes: frozenset[int] = RETRY_STATUS_CODES
+
+    def is_retryable_method(self, method: str) -> bool:
+        return method.upper() in self.retry_methods
+
+    def should_retry_response(self, response: httpx.Response) -> bool:
+        return response.status_code in self.retry_status_codes
+
+    def should_retry_exception(self, exception: Exception) -> bool:
+        return isinstance(exception, httpx.TransportError)
+
+    def get_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after_sec)
+
+        delay = min(
+            self.initial_delay_sec * (self.backoff_factor**attempt),
+            self.max_delay_sec,
+        )
+        if self.jitter:
+            # full jitter, spreads out clients retrying against the same outage
+            delay = random.uniform(0, delay)
+        return delay
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.warning(f"invalid retry-after: {value}")
+        return None
+
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str, retry_in_sec: float):
+        super().__init__(f"circuit open for {host}, retry in {retry_in_sec:.1f}s")
+        self.host = host
+        self.retry_in_sec = retry_in_sec
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = 5,
+        recovery_timeout_sec: float = 30,
+        half_open_max_calls: int = 1,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout_sec = recovery_timeout_sec
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.Closed
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.probe_started_at = 0.0
+
+    def before_request(self) -> None:
+        if self.state == CircuitState.Open:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.recovery_timeout_sec:
+                raise CircuitOpenError(self.host, self.recovery_timeout_sec - elapsed)
+
+            self.state = CircuitState.HalfOpen
+            self.half_open_calls = 0
+
+        if self.state == CircuitState.HalfOpen:
+            # only let a few probe requests through while the upstream recovers
+            if self.half_open_calls >= self.half_open_max_calls:
+                # probes still in flight, or lost to cancellation
+                if time.monotonic() - self.probe_started_at < self.recovery_timeout_sec:
+                    raise CircuitOpenError(self.host, 0)
+                self.half_open_calls = 0
+            self.half_open_calls += 1
+            self.probe_started_at = time.monotonic()
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.Closed:
+            logger.info(f"circuit closed for {self.host}")
+        self.state = CircuitState.Closed
+        self.failure_count = 0
+
+    def record_failure(self) -> None:
+        self.failure_count += 1
+
+        if (
+            self.state == CircuitState.HalfOpen
+            or self.failure_count >= self.failure_threshold
+        ):
+            if self.state != CircuitState.Open:
+                logger.warning(
+                    f"circuit opened for {self.host}, failures: {self.failure_count}"
+                )
+            self.state = CircuitState.Open
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class CircuitBreakerRegistry:
+    failure_threshold: int = 5
+    recovery_timeout_sec: float = 30
+    half_open_max_calls: int = 1
+    breakers: dict[str, CircuitBreaker] = field(default_factory=dict)
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=self.failure_threshold,
+                recovery_timeout_sec=self.recovery_timeout_sec,
+                half_open_max_calls=self.half_open_max_calls,
+            )
+        return breaker
+
+    def get_states(self) -> dict[str, CircuitState]:
+        return {host: breaker.state for host, breaker in self.breakers.items()}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import asyncio
+import weakref
+from dataclasses import dataclass
+
+import httpx
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    verify: bool = False
+    timeout: float = 10
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30
+    http2: bool = False  # needs the h2 package (httpx[http2])
+    max_connections_per_host: int | None = None
+
+    def to_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    # httpx only limits the whole pool, this caps in-flight requests per host
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self.transport = transport
+        self.max_per_host = max_per_host
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self.semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.semaphores[host] = asyncio.Semaphore(self.max_per_host)
+
+        async with semaphore:
+            return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+@dataclass
+class _ClientEntry:
+    client: httpx.AsyncClient
+    ref_count: int = 0
+
+
+class TransportRegistry:
+    # clients with the same config on the same event loop share one connection pool,
+    # the pool is closed when the last user releases it.
+    # A pool is tied to the loop it was used on, so pools are never shared across loops
+    # and a client acquired outside a running loop gets a pool of its own.
+    def __init__(self):
+        self.entries: dict[
+            tuple[asyncio.AbstractEventLoop, TransportConfig], _ClientEntry
+        ] = {}
+        # weak, callers that never release don't keep their clients alive here
+        self.unshared_clients: weakref.WeakSet[httpx.AsyncClient] = weakref.WeakSet()
+
+    def acquire(self, config: TransportConfig | None = None) -> httpx.AsyncClient:
+        config = config or TransportConfig()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            client = self._create_client(config)
+            self.unshared_clients.add(client)
+            return client
+
+        self._drop_closed_loops()
+
+        key = (loop, config)
+        entry = self.entries.get(key)
+        if entry is None or entry.client.is_closed:
+            entry = _ClientEntry(self._create_client(config))
+            self.entries[key] = entry
+
+        entry.ref_count += 1
+        return entry.client
+
+    def _drop_closed_loops(self):
+        # entries of loops that ended without releasing, their pools are unusable
+        for key in [key for key in self.entries if key[0].is_closed()]:
+            del self.entries[key]
+
+    async def release(self, client: httpx.AsyncClient) -> None:
+        if client in self.unshared_clients:
+            self.unshared_clients.discard(client)
+            await client.aclose()
+            return
+
+        for key, entry in self.entries.items():
+            if entry.client is client:
+                break
+        else:
+            logger.warning(f"releasing unknown client: {client}")
+            return
+
+        entry.ref_count -= 1
+        if entry.ref_count <= 0:
+            del self.entries[key]
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        clients = [entry.client for entry in self.entries.values()]
+        clients += list(self.unshared_clients)
+        self.entries = {}
+        self.unshared_clients = weakref.WeakSet()
+
+        for client in clients:
+            await client.aclose()
+
+    def _create_client(self, config: TransportConfig) -> httpx.AsyncClient:
+        transport = httpx.AsyncHTTPTransport(
+            verify=config.verify,
+            http2=config.http2,
+            limits=config.to_limits(),
+        )
+        if config.max_connections_per_host:
+            transport = HostLimitedTransport(transport, config.max_connections_per_host)
+
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=config.timeout,
+        )
+
+
+transport_registry = TransportRegistry()
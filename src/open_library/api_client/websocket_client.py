@@ -11,6 +11,14 @@ import websockets
 from websockets.exceptions import ConnectionClosedOK
 
 from open_library.logging.logging_filter import WebsocketLoggingFilter
+from open_library.api_client.const import OverflowPolicy
+from open_library.api_client.websocket_dispatcher import TopicDispatcher
+from open_library.api_client.websocket_recorder import FrameRecorder
+from open_library.api_client.websocket_codec import (
+    FrameType,
+    RawTopicExtractor,
+    default_decoder,
+)
 
 
 ws_logger = logging.getLogger("websockets.client")
@@ -51,6 +59,17 @@ class WebSocketClient:
         max_retries=10,
         initial_delay=1,
         max_delay=300,
+        dispatch_queue_size=1000,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DropOldest,
+        decoder: Callable[[FrameType], Any] = default_decoder,
+        raw_topic_extractor: RawTopicExtractor | None = None,
+        on_reconnect_failed: Callable[["WebSocketClient"], None] | None = None,
+        resubscribe_concurrency=16,
+        resubscribe_batcher: Callable[
+            [list[tuple[dict, dict]]], list[tuple[dict, dict]]
+        ]
+        | None = None,
+        recorder: FrameRecorder | None = None,
     ):
         self.uri = uri
         self.websocket = None
@@ -61,8 +80,27 @@ class WebSocketClient:
         self.token_manager = token_manager
         self.subscriptions = {}
         self.topic_extractor = topic_extractor  # Function to extract topic from message
+        self.decoder = decoder
+        # optional, extracts the same topic key from the raw frame (see RawFieldExtractor)
+        # so frames for unsubscribed topics are dropped without decoding
+        self.raw_topic_extractor = raw_topic_extractor
+        self.skipped_frame_count = 0
+        self.on_reconnect_failed = on_reconnect_failed
+
+        # resubscribe_batcher merges (header, body) subscribe messages where the protocol allows it
+        self.resubscribe_concurrency = resubscribe_concurrency
+        self.resubscribe_batcher = resubscribe_batcher
+        self.last_resubscribe_sec = None
+
+        # optional capture of raw inbound frames, see FrameReplayer
+        self.recorder = recorder
         self.receive_task = None
 
+        # receive only parses and routes, handlers run in per topic dispatchers
+        self.dispatch_queue_size = dispatch_queue_size
+        self.overflow_policy = overflow_policy
+        self.dispatchers: dict[Any, TopicDispatcher] = {}
+
         self.max_open_count = 10
         self.initial_reconnect_delay = 1
         self.reconnect_delay = 1
@@ -71,10 +109,13 @@ class WebSocketClient:
         self.websocket_connect_count = 0
         self.websocket_close_count = 0
         self.websocket_open_count = 0
+        # concurrent senders share one connect attempt
+        self.connect_lock = asyncio.Lock()
 
     async def connect(self):
         try:
-            await self._connect()
+            async with self.connect_lock:
+                await self._connect()
         except Exception as e:
             logger.warning(f"connection failed")
             return
@@ -114,6 +155,12 @@ class WebSocketClient:
 
         raise ConnectionRefusedError("Maximum retry count reached")
 
+    async def _ensure_connected(self):
+        # the socket is checked again under the lock, a concurrent caller may have connected
+        async with self.connect_lock:
+            if self.websocket is None or not self.websocket.open:
+                await self._connect()
+
     async def _reconnect(self):
         await self.close_connection()
 
@@ -127,11 +174,13 @@ class WebSocketClient:
 
         # Delay in seconds
         try:
-            await self._connect()
+            await self._ensure_connected()
             await self.resubscribe()
 
         except Exception as e:
             logger.warning(f"connection failed")
+            if self.on_reconnect_failed is not None:
+                self.on_reconnect_failed(self)
         finally:
             if time_since_last_reconnect > self.reconnect_delay * 2:
                 self.reconnect_delay = self.initial_reconnect_delay
@@ -146,10 +195,11 @@ class WebSocketClient:
             self.websocket_close_count += 1
             self.websocket_open_count -= 1
 
-    async def send(self, header, body, reconnect=True):
+    async def send(self, header, body, reconnect=True, access_token=None):
         header = header or {}
         body = body or {}
-        access_token = await self.token_manager.get_access_token()
+        if access_token is None:
+            access_token = await self.token_manager.get_access_token()
 
         header_updated = dict(token=access_token) | header
 
@@ -159,7 +209,7 @@ class WebSocketClient:
             logger.warning(f"trying to send, but not connected calling _connect")
 
             try:
-                await self._connect()
+                await self._ensure_connected()
             except Exception as e:
                 logger.warning(f"connection failed")
 
@@ -185,16 +235,18 @@ class WebSocketClient:
         handler: Callable,
         header: dict[str, str],
         body: dict[str, str],
+        send: bool = True,
     ):
+        # send=False only registers the handler, e.g. to replay recorded frames offline
         logger.info(f"subscribe, topic_key: {topic_key}")
-        if self.websocket is None or not self.websocket.open:
+        if send and (self.websocket is None or not self.websocket.open):
             try:
-                await self._connect()
+                await self._ensure_connected()
             except Exception as e:
                 logger.warning(f"connection failed")
                 return
 
-        if self.receive_task is None:
+        if send and self.receive_task is None:
             self.receive_task = asyncio.create_task(self.receive())
         # If the topic doesn't exist, create a list for handlers
         if topic_key not in self.subscriptions:
@@ -205,19 +257,73 @@ class WebSocketClient:
         if not any(sub.handler == handler for sub in self.subscriptions[topic_key]):
             self.subscriptions[topic_key].append(subscription_data)
 
-        if True or len(self.subscriptions[topic_key]) == 1:
+        if send:
             # Send a message to subscribe to the topic
             await self.send(header, body)
 
+    def _get_handlers(self, topic_key):
+        return [
+            subscription_data.handler
+            for subscription_data in self.subscriptions.get(topic_key, [])
+        ]
+
+    def _get_dispatcher(self, topic_key) -> TopicDispatcher:
+        dispatcher = self.dispatchers.get(topic_key)
+        if dispatcher is None:
+            dispatcher = TopicDispatcher(
+                topic_key,
+                self._get_handlers,
+                maxsize=self.dispatch_queue_size,
+                overflow_policy=self.overflow_policy,
+            )
+            dispatcher.start()
+            self.dispatchers[topic_key] = dispatcher
+        return dispatcher
+
+    async def _stop_dispatcher(self, topic_key):
+        dispatcher = self.dispatchers.pop(topic_key, None)
+        if dispatcher is not None:
+            await dispatcher.stop()
+
+    def get_dispatch_stats(self) -> dict:
+        return {
+            topic_key: dispatcher.get_stats()
+            for topic_key, dispatcher in self.dispatchers.items()
+        }
+
     async def resubscribe(self):
-        for topic_key, subscription_datas in self.subscriptions.items():
-            logger.info(f"resubscribe, topic_key: {topic_key}")
+        started_at = time.monotonic()
+
+        # one token for the whole reconnect cycle
+        access_token = await self.token_manager.get_access_token()
+
+        messages = [
+            (subscription_datas[0].header, subscription_datas[0].body)
+            for subscription_datas in self.subscriptions.values()
+            if subscription_datas
+        ]
+        if self.resubscribe_batcher is not None:
+            messages = self.resubscribe_batcher(messages)
 
-            subscription_data = subscription_datas[0]
-            header = subscription_data.header
-            body = subscription_data.body
+        semaphore = asyncio.Semaphore(self.resubscribe_concurrency)
 
-            await self.send(header, body, reconnect=False)
+        async def send_subscribe(header, body):
+            async with semaphore:
+                if self.websocket is None or not self.websocket.open:
+                    # dropped again, the next reconnect resubscribes everything
+                    return
+                await self.send(
+                    header, body, reconnect=False, access_token=access_token
+                )
+
+        await asyncio.gather(
+            *(send_subscribe(header, body) for header, body in messages)
+        )
+
+        self.last_resubscribe_sec = time.monotonic() - started_at
+        logger.info(
+            f"resubscribed {len(self.subscriptions)} topics with {len(messages)} messages in {self.last_resubscribe_sec:.3f}s"
+        )
 
     async def unsubscribe(
         self,
@@ -225,6 +331,7 @@ class WebSocketClient:
         handler: Callable,
         header: dict[str, str] | None = None,
         body: dict[str, str] | None = None,
+        send: bool = True,
     ):
         # Remove the handler from the list of handlers for this topic
         if topic_key in self.subscriptions:
@@ -236,14 +343,17 @@ class WebSocketClient:
 
             # If there are no more handlers, cancel the receive task
             if not self.subscriptions[topic_key]:
-                await self.send(header, body)
+                del self.subscriptions[topic_key]
+                await self._stop_dispatcher(topic_key)
+                if send:
+                    await self.send(header, body)
 
     async def receive(self):
         try:
             while True:
                 if self.websocket is None or not self.websocket.open:
                     try:
-                        await self._connect()
+                        await self._ensure_connected()
                     except Exception as e:
                         logger.warning(f"connection failed")
                         return
@@ -252,17 +362,10 @@ class WebSocketClient:
                     message = await self.websocket.recv()
                     # logging.info(f"Message received: {message}")
 
-                    response = json.loads(message)
-                    topic_key = self.topic_extractor(response)
-                    subscription_datas = self.subscriptions.get(topic_key, [])
-                    try:
-                        for subscription_data in subscription_datas:
-                            handler = subscription_data.handler
-                            await handler(response)
-                    except Exception as e:
-                        logger.exception(
-                            f"An error occurred in websocket handling: {e}"
-                        )
+                    if self.recorder is not None:
+                        self.recorder.write(message)
+
+                    await self.handle_frame(message)
                 except ConnectionClosedOK:
                     logger.warning(f"ConnectionClosedOK")
                     await self._reconnect()
@@ -280,9 +383,35 @@ class WebSocketClient:
         finally:
             self.receive_task = None
 
+    async def handle_frame(self, message: FrameType):
+        if self.raw_topic_extractor is not None:
+            raw_topic_key = self.raw_topic_extractor(message)
+            if raw_topic_key is not None and raw_topic_key not in self.subscriptions:
+                self.skipped_frame_count += 1
+                return
+
+        response = self.decoder(message)
+        topic_key = self.topic_extractor(response)
+        if topic_key in self.subscriptions:
+            await self._get_dispatcher(topic_key).put(response)
+
+    async def wait_dispatch_idle(self, poll_interval_sec: float = 0.01):
+        while not all(dispatcher.is_idle() for dispatcher in self.dispatchers.values()):
+            await asyncio.sleep(poll_interval_sec)
+
     async def close(self):
         # TODO: maybe send close event to handlers
 
         self.subscriptions = {}
+        for topic_key in list(self.dispatchers):
+            await self._stop_dispatcher(topic_key)
+
+        receive_task = self.receive_task
+        if receive_task is not None and receive_task is not asyncio.current_task():
+            receive_task.cancel()
+
+        if self.recorder is not None:
+            self.recorder.close()
+
         if self.websocket and self.websocket.open:
             await self.websocket.close()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import re
+from typing import Any, Callable
+
+from open_library.collections.dict import deserialize
+
+
+FrameType = str | bytes
+
+
+def default_decoder(frame: FrameType) -> Any:
+    # pydantic_core from_json, several times faster than json.loads on large frames
+    return deserialize(frame)
+
+
+class RawFieldExtractor:
+    """
+    Cheap topic extraction from the raw frame, before a full json parse.
+    Looks up string fields by name, e.g. RawFieldExtractor("tr_cd", "tr_key")
+    returns ("S3_", "005930") for '{"header": {"tr_cd": "S3_", "tr_key": "005930"}, ..}'
+    Returns None when a field isn't found, the caller falls back to a full parse.
+    """
+
+    def __init__(self, *field_names: str):
+        self.field_names = field_names
+        self.str_patterns = [
+            re.compile(rf'"{re.escape(name)}"\s*:\s*"([^"]*)"') for name in field_names
+        ]
+        self.bytes_patterns = [
+            re.compile(pattern.pattern.encode()) for pattern in self.str_patterns
+        ]
+
+    def __call__(self, frame: FrameType):
+        if isinstance(frame, bytes):
+            patterns = self.bytes_patterns
+        else:
+            patterns = self.str_patterns
+
+        values = []
+        for pattern in patterns:
+            match = pattern.search(frame)
+            if match is None:
+                return None
+
+            value = match.group(1)
+            if isinstance(value, bytes):
+                value = value.decode()
+            values.append(value)
+
+        if len(values) == 1:
+            return values[0]
+        return tuple(values)
+
+
+RawTopicExtractor = Callable[[FrameType], Any]
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+from typing import Any, Callable
+
+from open_library.api_client.const import OverflowPolicy
+from open_library.asynch.queue_worker import QueueWorker
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TopicDispatcher(QueueWorker):
+    # one bounded queue and worker per topic, a slow handler only delays its own topic
+    def __init__(
+        self,
+        topic_key,
+        get_handlers: Callable[[Any], list[Callable]],
+        maxsize: int = 1000,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DropOldest,
+    ):
+        match overflow_policy:
+            case OverflowPolicy.DropOldest:
+                super().__init__(maxsize)
+            case OverflowPolicy.CoalesceLatest:
+                # only the latest message is worth handling
+                super().__init__(1)
+            case OverflowPolicy.Block:
+                super().__init__(maxsize, drop_oldest=False)
+            case _:
+                raise ValueError(f"invalid overflow policy: {overflow_policy}")
+
+        self.topic_key = topic_key
+        self.get_handlers = get_handlers
+        self.overflow_policy = overflow_policy
+
+    async def handle(self, message):
+        for handler in self.get_handlers(self.topic_key):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.exception(
+                    f"An error occurred in websocket handling, topic: {self.topic_key}, {e}"
+                )
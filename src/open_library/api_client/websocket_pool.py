@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import asyncio
+import zlib
+from typing import Any, Callable
+
+from open_library.api_client.websocket_client import WebSocketClient
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WebSocketClientPool:
+    """
+    Shards subscriptions over several WebSocketClient connections, same subscribe/unsubscribe api.
+    Topics are placed by topic hash, or, with max_subscriptions_per_connection,
+    on the least loaded connection (a connection is added when all are full).
+    A connection whose reconnect fails is replaced by a new one at the same position
+    and its topics are subscribed again: with hash placement all of them go to the
+    replacement, with the subscription limit they go to the least loaded connections.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], WebSocketClient],
+        pool_size: int = 2,
+        max_subscriptions_per_connection: int | None = None,
+    ):
+        self.client_factory = client_factory
+        self.max_subscriptions_per_connection = max_subscriptions_per_connection
+
+        self.clients: list[WebSocketClient] = [
+            self._create_client() for _ in range(pool_size)
+        ]
+        self.topic_clients: dict[Any, WebSocketClient] = {}
+        self.rebalance_lock = asyncio.Lock()
+        self.rebalance_tasks = set()
+        self.rebalance_count = 0
+
+    def _create_client(self) -> WebSocketClient:
+        client = self.client_factory()
+        # each shard still reconnects on its own, we only step in when that fails
+        client.on_reconnect_failed = self._on_reconnect_failed
+        return client
+
+    def _select_client(self, topic_key) -> WebSocketClient:
+        limit = self.max_subscriptions_per_connection
+        if limit is None:
+            index = zlib.crc32(repr(topic_key).encode()) % len(self.clients)
+            return self.clients[index]
+
+        client = min(self.clients, key=lambda client: len(client.subscriptions))
+        if len(client.subscriptions) >= limit:
+            client = self._create_client()
+            self.clients.append(client)
+            logger.info(f"all connections full, pool size: {len(self.clients)}")
+        return client
+
+    async def subscribe(
+        self,
+        topic_key,
+        handler: Callable,
+        header: dict[str, str],
+        body: dict[str, str],
+    ):
+        client = self.topic_clients.get(topic_key)
+        if client is None:
+            client = self._select_client(topic_key)
+            self.topic_clients[topic_key] = client
+
+        await client.subscribe(topic_key, handler, header, body)
+
+    async def unsubscribe(
+        self,
+        topic_key,
+        handler: Callable,
+        header: dict[str, str] | None = None,
+        body: dict[str, str] | None = None,
+    ):
+        client = self.topic_clients.get(topic_key)
+        if client is None:
+            return
+
+        await client.unsubscribe(topic_key, handler, header, body)
+        if topic_key not in client.subscriptions:
+            del self.topic_clients[topic_key]
+
+    def _on_reconnect_failed(self, client: WebSocketClient):
+        task = asyncio.create_task(self._rebalance(client))
+        self.rebalance_tasks.add(task)
+        task.add_done_callback(self.rebalance_tasks.discard)
+
+    async def _rebalance(self, failed_client: WebSocketClient):
+        async with self.rebalance_lock:
+            if failed_client not in self.clients:
+                return
+
+            index = self.clients.index(failed_client)
+            self.clients[index] = self._create_client()
+            self.rebalance_count += 1
+
+            subscriptions = failed_client.subscriptions
+            logger.warning(
+                f"shard {index} reconnect failed, moving {len(subscriptions)} topics"
+            )
+            await failed_client.close()
+
+            for topic_key, subscription_datas in subscriptions.items():
+                self.topic_clients.pop(topic_key, None)
+                for subscription_data in subscription_datas:
+                    try:
+                        await self.subscribe(
+                            topic_key,
+                            subscription_data.handler,
+                            subscription_data.header,
+                            subscription_data.body,
+                        )
+                    except Exception as e:
+                        logger.exception(f"resubscribe failed, {topic_key}: {e}")
+
+    def get_dispatch_stats(self) -> dict:
+        result = {}
+        for client in self.clients:
+            result |= client.get_dispatch_stats()
+        return result
+
+    def get_shard_stats(self) -> list[dict]:
+        return [
+            dict(
+                subscriptions=len(client.subscriptions),
+                connected=client.websocket is not None and client.websocket.open,
+                connect_count=client.websocket_connect_count,
+            )
+            for client in self.clients
+        ]
+
+    async def close(self):
+        for client in self.clients:
+            await client.close()
+        self.topic_clients = {}
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import re
+import gzip
+import time
+import struct
+import asyncio
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from open_library.api_client.websocket_codec import FrameType
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"WSR1"
+# monotonic timestamp, payload length, is_bytes flag
+FRAME_HEADER = struct.Struct("<dI?")
+
+
+class FrameRecorder:
+    """
+    Appends raw inbound frames with monotonic timestamps to segment files,
+    <directory>/<name>-000001.wsrec(.gz), a new segment starts after max_bytes of payload.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str = "frames",
+        max_bytes: int = 256 * 1024 * 1024,
+        compress: bool = True,
+        max_segments: int | None = None,
+    ):
+        self.directory = Path(directory)
+        self.name = name
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.max_segments = max_segments
+
+        # the name may contain dots or dashes, only the index after it is parsed
+        self.segment_pattern = re.compile(rf"{re.escape(name)}-(\d+)\.wsrec(\.gz)?")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # continue after existing segments, older ones may have been removed
+        self.segment_index = max(
+            (index for index, _ in self._indexed_segment_paths()), default=0
+        )
+        self.file: BinaryIO | None = None
+        self.written_bytes = 0
+        self.frame_count = 0
+
+    def _indexed_segment_paths(self) -> list[tuple[int, Path]]:
+        indexed_paths = []
+        for path in self.directory.iterdir():
+            match = self.segment_pattern.fullmatch(path.name)
+            if match is not None:
+                indexed_paths.append((int(match.group(1)), path))
+        return sorted(indexed_paths)
+
+    def segment_paths(self) -> list[Path]:
+        return [path for _, path in self._indexed_segment_paths()]
+
+    def _open_segment(self):
+        self.segment_index += 1
+        suffix = ".wsrec.gz" if self.compress else ".wsrec"
+        path = self.directory / f"{self.name}-{self.segment_index:06d}{suffix}"
+
+        # level 1, the recorder runs in the receive path
+        self.file = (
+            gzip.open(path, "wb", compresslevel=1)
+            if self.compress
+            else open(path, "wb")
+        )
+        self.file.write(MAGIC)
+        self.written_bytes = 0
+
+        if self.max_segments is not None:
+            for old_path in self.segment_paths()[: -self.max_segments]:
+                old_path.unlink()
+
+    def write(self, frame: FrameType, timestamp: float | None = None):
+        if self.file is None or self.written_bytes >= self.max_bytes:
+            self.close()
+            self._open_segment()
+
+        is_bytes = isinstance(frame, bytes)
+        payload = frame if is_bytes else frame.encode()
+        timestamp = time.monotonic() if timestamp is None else timestamp
+
+        self.file.write(FRAME_HEADER.pack(timestamp, len(payload), is_bytes))
+        self.file.write(payload)
+        self.written_bytes += FRAME_HEADER.size + len(payload)
+        self.frame_count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_frames(path: Path) -> Iterator[tuple[float, FrameType]]:
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+
+    with opener(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"not a frame recording: {path}")
+
+        while True:
+            header = file.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                # end of file, or a segment cut short by a crash
+                return
+
+            timestamp, length, is_bytes = FRAME_HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+
+            yield timestamp, payload if is_bytes else payload.decode()
+
+
+class FrameReplayer:
+    """
+    Feeds recorded frames through WebSocketClient.handle_frame, so the same subscriptions handlers run.
+    Offline, register the handlers with subscribe(..., send=False).
+    speed: 1 is original speed, N is N times faster, None is as fast as possible
+    """
+
+    def __init__(self, paths: list[Path], speed: float | None = 1.0):
+        self.paths = [Path(path) for path in paths]
+        self.speed = speed
+
+    @classmethod
+    def from_recorder(cls, recorder: FrameRecorder, speed: float | None = 1.0):
+        return cls(recorder.segment_paths(), speed=speed)
+
+    def frames(self) -> Iterator[tuple[float, FrameType]]:
+        for path in self.paths:
+            yield from read_frames(path)
+
+    async def replay(self, client, drain: bool = True) -> dict:
+        frame_count = 0
+        first_timestamp = None
+        started_at = time.monotonic()
+
+        for timestamp, frame in self.frames():
+            if first_timestamp is None:
+                first_timestamp = timestamp
+
+            if self.speed:
+                target_at = started_at + (timestamp - first_timestamp) / self.speed
+                delay = target_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif frame_count % 1000 == 0:
+                # let the dispatcher workers run
+                await asyncio.sleep(0)
+
+            await client.handle_frame(frame)
+            frame_count += 1
+
+        if drain:
+            await client.wait_dispatch_idle()
+
+        elapsed_sec = time.monotonic() - started_at
+        return dict(
+            frames=frame_count,
+            elapsed_sec=elapsed_sec,
+            frames_per_sec=frame_count / elapsed_sec if elapsed_sec else 0.0,
+        )
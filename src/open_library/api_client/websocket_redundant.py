@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from open_library.api_client.websocket_client import WebSocketClient
+from open_library.api_client.websocket_dispatcher import TopicDispatcher
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RedundantWebSocketClient:
+    """
+    Keeps two (or more) live connections subscribed to the same topics and merges the streams,
+    a drop on one leg costs no gap while the other is up.
+    Duplicates are removed with sequence_key (monotonic per topic) when given,
+    otherwise with message_key over a window of recently seen keys.
+    New messages of a topic go through one dispatcher whichever leg delivered them,
+    so its handlers run in order and never concurrently.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], WebSocketClient],
+        message_key: Callable[[Any], Hashable] | None = None,
+        sequence_key: Callable[[Any], int] | None = None,
+        leg_count: int = 2,
+        dedup_window: int = 10000,
+    ):
+        if message_key is None and sequence_key is None:
+            raise ValueError("message_key or sequence_key is required")
+
+        self.legs = [client_factory() for _ in range(leg_count)]
+        self.leg_handlers = [
+            self._make_leg_handler(index) for index in range(leg_count)
+        ]
+        self.topic_extractor = self.legs[0].topic_extractor
+
+        self.message_key = message_key
+        self.sequence_key = sequence_key
+        self.dedup_window = dedup_window
+
+        self.handlers: dict[Any, list[Callable]] = {}
+        self.dispatchers: dict[Any, TopicDispatcher] = {}
+        self.seen_keys: dict[Any, OrderedDict] = {}
+        self.last_sequences: dict[Any, int] = {}
+
+        self.first_delivery_counts = [0] * leg_count
+        self.duplicate_count = 0
+
+    def _is_new(self, topic_key, message) -> bool:
+        # no await in here, legs can't interleave between the check and the update
+        if self.sequence_key is not None:
+            sequence = self.sequence_key(message)
+            last_sequence = self.last_sequences.get(topic_key)
+            if last_sequence is not None and sequence <= last_sequence:
+                return False
+            self.last_sequences[topic_key] = sequence
+            return True
+
+        key = self.message_key(message)
+        seen_keys = self.seen_keys.get(topic_key)
+        if seen_keys is None:
+            seen_keys = self.seen_keys[topic_key] = OrderedDict()
+        elif key in seen_keys:
+            return False
+
+        seen_keys[key] = None
+        if len(seen_keys) > self.dedup_window:
+            seen_keys.popitem(last=False)
+        return True
+
+    def _make_leg_handler(self, leg_index: int):
+        async def leg_handler(message):
+            topic_key = self.topic_extractor(message)
+            if not self._is_new(topic_key, message):
+                self.duplicate_count += 1
+                return
+
+            self.first_delivery_counts[leg_index] += 1
+            if topic_key in self.handlers:
+                await self._get_dispatcher(topic_key).put(message)
+
+        return leg_handler
+
+    def _get_handlers(self, topic_key):
+        return self.handlers.get(topic_key, [])
+
+    def _get_dispatcher(self, topic_key) -> TopicDispatcher:
+        dispatcher = self.dispatchers.get(topic_key)
+        if dispatcher is None:
+            leg = self.legs[0]
+            dispatcher = TopicDispatcher(
+                topic_key,
+                self._get_handlers,
+                maxsize=leg.dispatch_queue_size,
+                overflow_policy=leg.overflow_policy,
+            )
+            dispatcher.start()
+            self.dispatchers[topic_key] = dispatcher
+        return dispatcher
+
+    async def _stop_dispatcher(self, topic_key):
+        dispatcher = self.dispatchers.pop(topic_key, None)
+        if dispatcher is not None:
+            await dispatcher.stop()
+
+    async def subscribe(
+        self,
+        topic_key,
+        handler: Callable,
+        header: dict[str, str],
+        body: dict[str, str],
+    ):
+        handlers = self.handlers.setdefault(topic_key, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+        for leg, leg_handler in zip(self.legs, self.leg_handlers):
+            await leg.subscribe(topic_key, leg_handler, header, body)
+
+    async def unsubscribe(
+        self,
+        topic_key,
+        handler: Callable,
+        header: dict[str, str] | None = None,
+        body: dict[str, str] | None = None,
+    ):
+        handlers = self.handlers.get(topic_key)
+        if handlers is None:
+            return
+
+        self.handlers[topic_key] = [h for h in handlers if h is not handler]
+        if self.handlers[topic_key]:
+            return
+
+        del self.handlers[topic_key]
+        self.seen_keys.pop(topic_key, None)
+        self.last_sequences.pop(topic_key, None)
+        await self._stop_dispatcher(topic_key)
+        for leg, leg_handler in zip(self.legs, self.leg_handlers):
+            await leg.unsubscribe(topic_key, leg_handler, header, body)
+
+    def get_stats(self) -> dict:
+        delivered = sum(self.first_delivery_counts)
+        return dict(
+            delivered=delivered,
+            duplicates=self.duplicate_count,
+            first_delivery_counts=list(self.first_delivery_counts),
+            first_delivery_ratios=[
+                count / delivered if delivered else 0.0
+                for count in self.first_delivery_counts
+            ],
+            dispatch={
+                topic_key: dispatcher.get_stats()
+                for topic_key, dispatcher in self.dispatchers.items()
+            },
+        )
+
+    async def close(self):
+        self.handlers = {}
+        for topic_key in list(self.dispatchers):
+            await self._stop_dispatcher(topic_key)
+        for leg in self.legs:
+            await leg.close()
@@ -5,6 +5,8 @@ from open_library.environment.environment import Environment
 
 class BaseApp:
     name = "base_app"
+    # LifecycleManager of the app's services, set by the app
+    lifecycle_manager = None
 
     def __init__(self, env_directory, env_file):
         self.environment = Environment(env_directory=env_directory, env_file=env_file)
@@ -22,3 +24,11 @@ class BaseApp:
         setup_logging(
             log_dir_path, log_to_file=log_to_file, app_name=self.name, tz=local_timezone
         )
+
+    async def startup(self):
+        if self.lifecycle_manager is not None:
+            await self.lifecycle_manager.start_all()
+
+    async def shutdown(self):
+        if self.lifecycle_manager is not None:
+            await self.lifecycle_manager.stop_all()
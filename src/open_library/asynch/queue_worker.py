@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import abc
+import time
+import asyncio
+
+from open_library.asynch.queue import DroppingQueue
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueueWorker(abc.ABC):
+    """
+    A bounded queue with one task handling its messages in arrival order.
+    drop_oldest: a full queue drops its oldest message, otherwise put waits for room
+    """
+
+    def __init__(self, maxsize: int = 1000, drop_oldest: bool = True):
+        self.drop_oldest = drop_oldest
+        self.queue = DroppingQueue(maxsize) if drop_oldest else asyncio.Queue(maxsize)
+
+        self.task = None
+        self.handling = False
+        self.enqueued_count = 0
+        self.dropped_count = 0
+        self.processed_count = 0
+        self.last_lag_sec = 0.0
+        self.max_lag_sec = 0.0
+
+    @abc.abstractmethod
+    async def handle(self, message):
+        pass
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def _detach(self) -> asyncio.Task | None:
+        task, self.task = self.task, None
+        if task is None or task is asyncio.current_task():
+            # stopped by the message being handled, cancelling would also cancel
+            # the rest of that call, run() exits once it returns
+            return None
+        task.cancel()
+        return task
+
+    def cancel(self):
+        self._detach()
+
+    async def stop(self):
+        task = self._detach()
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _drop_if_full(self):
+        if self.drop_oldest and self.queue.full():
+            self.queue.get_nowait()
+            self.dropped_count += 1
+
+    def put_nowait(self, message):
+        self._drop_if_full()
+        self.enqueued_count += 1
+        self.queue.put_nowait((time.monotonic(), message))
+
+    async def put(self, message):
+        self._drop_if_full()
+        self.enqueued_count += 1
+        await self.queue.put((time.monotonic(), message))
+
+    async def run(self):
+        # a replaced or detached task ends here
+        while self.task is asyncio.current_task():
+            enqueued_at, message = await self.queue.get()
+            self.handling = True
+            try:
+                await self.handle(message)
+            except Exception as e:
+                logger.exception(f"queue worker handling failed: {self}, {e}")
+            finally:
+                self.handling = False
+
+            self.processed_count += 1
+            self.last_lag_sec = time.monotonic() - enqueued_at
+            self.max_lag_sec = max(self.max_lag_sec, self.last_lag_sec)
+
+    def is_idle(self) -> bool:
+        return not self.handling and self.queue.empty()
+
+    def get_stats(self) -> dict:
+        return dict(
+            depth=self.queue.qsize(),
+            enqueued=self.enqueued_count,
+            dropped=self.dropped_count,
+            processed=self.processed_count,
+            last_lag_sec=self.last_lag_sec,
+            max_lag_sec=self.max_lag_sec,
+        )
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import operator
 import functools
-from typing import Protocol
+from typing import Any, Callable, Protocol
 from pydantic import BaseModel
 from typing import ClassVar
 
@@ -23,15 +23,99 @@ class AttributeProtocol(Protocol):
         ...
 
 
+EXCLUDED_ATTR_NAMES = frozenset(["data", "service_keys"])
+
+# per instance caches, kept in __dict__ next to the field values,
+# left out of equality and pickling (a hash isn't valid in another process)
+ATTR_NAMES_CACHE = "_attr_names_cache"
+HASH_CACHE = "_hash_cache"
+
+
 class BaseSpec(BaseModel):
     spec_type_name_classvar: ClassVar[str]
+    attr_field_names: ClassVar[tuple[str, ...]] = ()
+    attr_computed_names: ClassVar[tuple[str, ...]] = ()
+    field_values: ClassVar[Callable[[dict], Any]]
+    # __dict__ keys dropped whenever a field changes, subclasses may add their own
+    instance_cache_names: ClassVar[tuple[str, ...]] = (ATTR_NAMES_CACHE, HASH_CACHE)
     spec_type_name: str = ""
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs):
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._compute_attr_field_names()
+
+    @classmethod
+    def _compute_attr_field_names(cls):
+        cls.attr_field_names = tuple(
+            name for name in cls.model_fields if name not in EXCLUDED_ATTR_NAMES
+        )
+        cls.attr_computed_names = tuple(
+            name
+            for name in cls.model_computed_fields
+            if name not in EXCLUDED_ATTR_NAMES
+        )
+        cls.field_values = operator.itemgetter(*cls.model_fields)
+
+    def _clear_instance_caches(self):
+        for cache_name in self.instance_cache_names:
+            self.__dict__.pop(cache_name, None)
+
+    def __setattr__(self, name, value):
+        # mutable specs, values changed so the cached names and hash are stale
+        self._clear_instance_caches()
+        super().__setattr__(name, value)
+
+    def __eq__(self, other):
+        # field values only, the caches may be filled on one side
+        if type(self) is not type(other):
+            return super().__eq__(other)
+        return (
+            self.field_values(self.__dict__) == other.field_values(other.__dict__)
+            and (self.__pydantic_extra__ or {}) == (other.__pydantic_extra__ or {})
+            and self.__pydantic_private__ == other.__pydantic_private__
+        )
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["__dict__"] = {
+            name: value
+            for name, value in state["__dict__"].items()
+            if name not in self.instance_cache_names
+        }
+        return state
+
+    def __copy__(self):
+        copied = super().__copy__()
+        copied._clear_instance_caches()
+        return copied
+
+    def model_copy(self, *args, **kwargs):
+        copied = super().model_copy(*args, **kwargs)
+        copied._clear_instance_caches()
+        return copied
+
     def attr_names(self) -> list[str]:
-        names = self.model_dump(
-            exclude_none=True, exclude=set(["data", "service_keys"])
-        ).keys()
-        names = list(names)
+        # same names as model_dump(exclude_none=True, exclude=EXCLUDED_ATTR_NAMES).keys()
+        names = self.__dict__.get(ATTR_NAMES_CACHE)
+        if names is None:
+            names = [
+                name
+                for name in self.attr_field_names
+                if getattr(self, name) is not None
+            ]
+            if self.__pydantic_extra__:
+                names.extend(
+                    name
+                    for name, value in self.__pydantic_extra__.items()
+                    if value is not None and name not in EXCLUDED_ATTR_NAMES
+                )
+            names.extend(
+                name
+                for name in self.attr_computed_names
+                if getattr(self, name) is not None
+            )
+            self.__dict__[ATTR_NAMES_CACHE] = names
         return names
 
     def attr_value(self, attr_name: str) -> AttributeProtocol:
@@ -43,13 +127,15 @@ class BaseSpec(BaseModel):
         return len(self.attr_names())
 
     def __hash__(self) -> int:
-        # hash_keys = self.hash_keys or []
-        hash_keys = self.attr_names() or []
-        values_to_hash = (getattr(self, key) for key in hash_keys)
-
-        attrs_hash = map(hash, values_to_hash)
+        attrs_hash = self.__dict__.get(HASH_CACHE)
+        if attrs_hash is None:
+            # hash_keys = self.hash_keys or []
+            hash_keys = self.attr_names() or []
+            values_to_hash = (getattr(self, key) for key in hash_keys)
 
-        return functools.reduce(operator.xor, attrs_hash, 0)
+            attrs_hash = functools.reduce(operator.xor, map(hash, values_to_hash), 0)
+            self.__dict__[HASH_CACHE] = attrs_hash
+        return attrs_hash
 
     @classmethod
     def from_dict(cls, data: dict):
@@ -66,3 +152,6 @@ class BaseSpec(BaseModel):
     @property
     def hash_keys(self):
         pass
+
+
+BaseSpec._compute_attr_field_names()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from open_library.asynch.util import wrap_func_in_coro
+from open_library.locator.service_locator import ServiceKey, ServiceLocator
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ManagedService:
+    service_key: ServiceKey
+    depends_on: tuple[ServiceKey, ...] = ()
+    # method name on the service or a callable taking the service, missing methods are skipped
+    start: str | Callable[[Any], Any] | None = "start"
+    stop: str | Callable[[Any], Any] | None = "stop"
+    timeout_sec: float | None = None
+
+
+@dataclass
+class StartupTiming:
+    service_key: ServiceKey
+    waited_sec: float = 0.0  # for dependencies
+    duration_sec: float = 0.0  # construct and start
+    error: str | None = None
+
+
+@dataclass
+class StartupReport:
+    total_sec: float = 0.0
+    timings: list[StartupTiming] = field(default_factory=list)
+
+    def slowest(self, count: int = 5) -> list[StartupTiming]:
+        return sorted(self.timings, key=lambda t: t.duration_sec, reverse=True)[:count]
+
+
+class LifecycleManager:
+    """
+    Starts the services of a ServiceLocator once their dependencies are started,
+    independent services start concurrently. Lazy services are constructed
+    (aget_service) as part of their start.
+    Shutdown runs the other way around, a service stops after everything depending on it.
+    """
+
+    def __init__(self, service_locator: ServiceLocator):
+        self.service_locator = service_locator
+        self.managed: dict[ServiceKey, ManagedService] = {}
+        self.started_keys: list[ServiceKey] = []
+        self.report: StartupReport | None = None
+
+    def add(
+        self,
+        service_key: ServiceKey,
+        depends_on: list[ServiceKey] | tuple[ServiceKey, ...] = (),
+        start: str | Callable[[Any], Any] | None = "start",
+        stop: str | Callable[[Any], Any] | None = "stop",
+        timeout_sec: float | None = None,
+    ):
+        self.managed[service_key] = ManagedService(
+            service_key, tuple(depends_on), start, stop, timeout_sec
+        )
+
+    def startup_order(self) -> list[ServiceKey]:
+        # topological order, raises on a cycle or an unknown dependency
+        order = []
+        states: dict[ServiceKey, str] = {}
+
+        def visit(service_key, path):
+            state = states.get(service_key)
+            if state == "done":
+                return
+            if state == "visiting":
+                cycle = " -> ".join(str(key.service_name) for key in path)
+                raise ValueError(f"service dependency cycle: {cycle}")
+
+            states[service_key] = "visiting"
+            for dependency in self.managed[service_key].depends_on:
+                if dependency in self.managed:
+                    visit(dependency, path + [dependency])
+                elif not self.service_locator.is_registered(dependency):
+                    raise ValueError(
+                        f"unknown dependency of {service_key}: {dependency}"
+                    )
+            states[service_key] = "done"
+            order.append(service_key)
+
+        for service_key in self.managed:
+            visit(service_key, [service_key])
+        return order
+
+    async def _call(self, service, hook, timeout_sec):
+        if hook is None:
+            return
+        if isinstance(hook, str):
+            hook = getattr(service, hook, None)
+            if hook is None:
+                return
+            coroutine = wrap_func_in_coro(hook)()
+        else:
+            coroutine = wrap_func_in_coro(hook)(service)
+
+        if timeout_sec is None:
+            await coroutine
+        else:
+            await asyncio.wait_for(coroutine, timeout_sec)
+
+    async def _start_one(
+        self,
+        managed: ManagedService,
+        dependency_tasks: list[asyncio.Task],
+        timing: StartupTiming,
+    ):
+        waiting_at = time.monotonic()
+        try:
+            await asyncio.gather(*dependency_tasks)
+        except Exception:
+            raise Exception("a dependency failed to start") from None
+        started_at = time.monotonic()
+        timing.waited_sec = started_at - waiting_at
+
+        try:
+            service = await self.service_locator.aget_service(managed.service_key)
+            await self._call(service, managed.start, managed.timeout_sec)
+            self.started_keys.append(managed.service_key)
+        finally:
+            timing.duration_sec = time.monotonic() - started_at
+
+    async def start_all(self) -> StartupReport:
+        order = self.startup_order()
+        started_at = time.monotonic()
+
+        tasks: dict[ServiceKey, asyncio.Task] = {}
+        timings: dict[ServiceKey, StartupTiming] = {}
+        for service_key in order:
+            managed = self.managed[service_key]
+            timing = timings[service_key] = StartupTiming(service_key)
+            dependency_tasks = [
+                tasks[dependency]
+                for dependency in managed.depends_on
+                if dependency in tasks
+            ]
+            tasks[service_key] = asyncio.create_task(
+                self._start_one(managed, dependency_tasks, timing)
+            )
+
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        self.report = StartupReport(
+            time.monotonic() - started_at, list(timings.values())
+        )
+        failures = []
+        for service_key, result in zip(tasks, results):
+            if isinstance(result, BaseException):
+                timings[service_key].error = repr(result)
+                failures.append(f"{service_key.service_name}: {result!r}")
+
+        for timing in self.report.slowest(len(timings)):
+            logger.info(
+                f"service startup: {timing.service_key.service_name}, {timing.duration_sec:.3f}s (waited {timing.waited_sec:.3f}s)"
+            )
+        logger.info(f"services started in {self.report.total_sec:.3f}s")
+
+        if failures:
+            # leave nothing half started
+            await self.stop_all()
+            raise Exception(f"service startup failed: {', '.join(failures)}")
+        return self.report
+
+    async def _stop_one(self, managed: ManagedService, dependent_tasks):
+        await asyncio.gather(*dependent_tasks, return_exceptions=True)
+        try:
+            service = self.service_locator.get_service(managed.service_key)
+            await self._call(service, managed.stop, managed.timeout_sec)
+        except Exception as e:
+            logger.exception(f"service stop failed: {managed.service_key}, {e}")
+
+    async def stop_all(self):
+        started_keys = set(self.started_keys)
+        self.started_keys = []
+
+        tasks: dict[ServiceKey, asyncio.Task] = {}
+        for service_key in reversed(self.startup_order()):
+            if service_key not in started_keys:
+                continue
+
+            dependent_tasks = [
+                task
+                for dependent_key, task in tasks.items()
+                if service_key in self.managed[dependent_key].depends_on
+            ]
+            tasks[service_key] = asyncio.create_task(
+                self._stop_one(self.managed[service_key], dependent_tasks)
+            )
+
+        await asyncio.gather(*tasks.values())
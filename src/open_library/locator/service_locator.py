@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
+import asyncio
+import inspect
+from typing import Any, Callable
+
 from open_library.collections.dict import hashable_json
 from pydantic import BaseModel
-from open_library.base_spec.base_spec import BaseSpec
+from open_library.base_spec.base_spec import BaseSpec, HASH_CACHE
 
 
 class ServiceKey(BaseSpec):
@@ -15,10 +19,15 @@ class ServiceKey(BaseSpec):
         frozen = True
 
     def __hash__(self):
-        # Create a hash from a tuple representation of the data
-        # Convert the dict to a tuple of items to ensure it's hashable
-        params_items = tuple(sorted(self.params.items())) if self.params else None
-        return hash((self.service_type, self.service_name, params_items))
+        # frozen, so the hash is computed once
+        key_hash = self.__dict__.get(HASH_CACHE)
+        if key_hash is None:
+            # Create a hash from a tuple representation of the data
+            # Convert the dict to a tuple of items to ensure it's hashable
+            params_items = tuple(sorted(self.params.items())) if self.params else None
+            key_hash = hash((self.service_type, self.service_name, params_items))
+            self.__dict__[HASH_CACHE] = key_hash
+        return key_hash
 
     def __eq__(self, other):
         if isinstance(other, ServiceKey):
@@ -31,18 +40,150 @@ class ServiceKey(BaseSpec):
         return False
 
 
+class ServiceHandle:
+    """
+    Lookup token for one service key, resolve it once and keep it,
+    get() is then an attribute read. The locator updates the handle
+    when the service is constructed, replaced or removed.
+    """
+
+    __slots__ = ("service_locator", "service_key", "service")
+
+    def __init__(self, service_locator: "ServiceLocator", service_key: ServiceKey):
+        self.service_locator = service_locator
+        self.service_key = service_key
+        self.service = None
+
+    def get(self):
+        service = self.service
+        if service is None:
+            service = self.service_locator.get_service(self.service_key)
+        return service
+
+    async def aget(self):
+        service = self.service
+        if service is None:
+            service = await self.service_locator.aget_service(self.service_key)
+        return service
+
+
 class ServiceLocator:
     def __init__(self):
         self._services = {}
+        # bumped when a registered service is replaced or removed,
+        # callers caching a resolved service compare it to know it's stale
+        self.generation = 0
 
-    def register_service(self, service_key, service):
-        if service_key in self._services:
-            raise Exception(f"service already registered: {service_key}")
+        # lazy services, constructed on first get
+        self._factories: dict[ServiceKey, Callable[[], Any]] = {}
+        self._constructing: dict[ServiceKey, asyncio.Task] = {}
+        self._handles: dict[ServiceKey, ServiceHandle] = {}
 
+    def _set_service(self, service_key, service):
         self._services[service_key] = service
+        handle = self._handles.get(service_key)
+        if handle is not None:
+            handle.service = service
+
+    def register_service(self, service_key, service, replace: bool = False):
+        if service_key in self._services or service_key in self._factories:
+            if not replace:
+                raise Exception(f"service already registered: {service_key}")
+            self._factories.pop(service_key, None)
+            self.generation += 1
+
+        self._set_service(service_key, service)
+
+    def register_factory(
+        self, service_key, factory: Callable[[], Any], replace: bool = False
+    ):
+        """
+        factory (sync or async) builds the service on first use, services nobody uses are never built.
+        """
+        if service_key in self._services or service_key in self._factories:
+            if not replace:
+                raise Exception(f"service already registered: {service_key}")
+            self.unregister_service(service_key)
+
+        self._factories[service_key] = factory
+
+    def unregister_service(self, service_key):
+        if service_key in self._services:
+            del self._services[service_key]
+        elif service_key in self._factories:
+            del self._factories[service_key]
+        else:
+            raise Exception(f"service not registered: {service_key}")
+
+        handle = self._handles.get(service_key)
+        if handle is not None:
+            handle.service = None
+        self.generation += 1
 
     def get_service(self, service_key):
-        if service_key not in self._services:
+        try:
+            return self._services[service_key]
+        except KeyError:
+            pass
+
+        factory = self._factories.get(service_key)
+        if factory is None:
             raise Exception(f"service not registered: {service_key}")
+        if inspect.iscoroutinefunction(factory):
+            raise Exception(
+                f"service has an async factory, use aget_service: {service_key}"
+            )
+
+        service = factory()
+        if inspect.isawaitable(service):
+            # e.g. a lambda around a coroutine function, the factory stays registered
+            if inspect.iscoroutine(service):
+                service.close()
+            raise Exception(
+                f"service factory returned an awaitable, use aget_service: {service_key}"
+            )
+
+        del self._factories[service_key]
+        self._set_service(service_key, service)
+        return service
+
+    async def aget_service(self, service_key):
+        try:
+            return self._services[service_key]
+        except KeyError:
+            pass
+
+        task = self._constructing.get(service_key)
+        if task is None:
+            if service_key not in self._factories:
+                raise Exception(f"service not registered: {service_key}")
+            # concurrent first users share one construction
+            task = asyncio.create_task(self._construct(service_key))
+            self._constructing[service_key] = task
+        return await asyncio.shield(task)
+
+    async def _construct(self, service_key):
+        try:
+            factory = self._factories[service_key]
+            service = factory()
+            if inspect.isawaitable(service):
+                service = await service
+        finally:
+            del self._constructing[service_key]
+
+        # may have been replaced or removed while constructing
+        if self._factories.get(service_key) is factory:
+            del self._factories[service_key]
+            self._set_service(service_key, service)
+        return service
+
+    def get_handle(self, service_key) -> ServiceHandle:
+        handle = self._handles.get(service_key)
+        if handle is None:
+            handle = ServiceHandle(self, service_key)
+            handle.service = self._services.get(service_key)
+            self._handles[service_key] = handle
+        return handle
 
-        return self._services[service_key]
+    def is_registered(self, service_key) -> bool:
+        return service_key in self._services or service_key in self._factories
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+
+import math
+from bisect import bisect_right
+from typing import Any, Hashable
+
+from open_library.base_spec.base_spec import AttributeProtocol
+from open_library.observe.spec_value import OneOf, Prefix, Range, SpecValue
+
+Path = tuple[str, ...]
+Predicate = tuple[Path, Hashable]
+
+PREFIX_END = ""  # never a single character, so it can share the trie nodes
+
+
+def _hashable(value: Any) -> Hashable:
+    if isinstance(value, (list, set)):
+        return tuple(value)
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    return value
+
+
+def flatten_spec(data: AttributeProtocol, prefix: Path = ()) -> list[Predicate]:
+    """
+    (path, value) pairs for every leaf attribute that isn't None, nested specs are walked.
+    False, 0 and "" are values like any other.
+    """
+    predicates = []
+    for attr_name in data.attr_names():
+        attr_value = data.attr_value(attr_name)
+        if attr_value is None:
+            continue
+
+        path = prefix + (attr_name,)
+        if hasattr(attr_value, "attr_names"):
+            predicates.extend(flatten_spec(attr_value, path))
+        else:
+            predicates.append((path, _hashable(attr_value)))
+    return predicates
+
+
+class PrefixIndex:
+    # character trie of subscribed prefixes, a lookup walks the event value once
+    def __init__(self):
+        self.root: dict = {}
+
+    def add(self, prefix: str, spec_id: int):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(PREFIX_END, set()).add(spec_id)
+
+    def discard(self, prefix: str, spec_id: int):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return
+        node.get(PREFIX_END, set()).discard(spec_id)
+
+    def query(self, value: str) -> list[int]:
+        spec_ids = []
+        node = self.root
+        for char in value:
+            spec_ids.extend(node.get(PREFIX_END, ()))
+            node = node.get(char)
+            if node is None:
+                return spec_ids
+        spec_ids.extend(node.get(PREFIX_END, ()))
+        return spec_ids
+
+
+class _IntervalNode:
+    def __init__(self, intervals: list[tuple[Range, int]]):
+        bounds = sorted(
+            bound
+            for value_range, _ in intervals
+            for bound in (value_range.low_bound, value_range.high_bound)
+            if abs(bound) != math.inf
+        )
+        self.center = bounds[len(bounds) // 2] if bounds else 0
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            value_range = interval[0]
+            if value_range.high_bound < self.center:
+                left.append(interval)
+            elif value_range.low_bound > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        if len(left) == len(intervals) or len(right) == len(intervals):
+            # no split, e.g. an empty interval built without validation,
+            # keep them here, query still checks every candidate with matches()
+            left, right, here = [], [], intervals
+
+        # intervals here all contain the center
+        self.by_low = sorted(here, key=lambda interval: interval[0].low_bound)
+        self.lows = [interval[0].low_bound for interval in self.by_low]
+        self.by_high = sorted(here, key=lambda interval: -interval[0].high_bound)
+        self.left = _IntervalNode(left) if left else None
+        self.right = _IntervalNode(right) if right else None
+
+    def query(self, value, spec_ids: list[int]):
+        node = self
+        while node is not None:
+            if value < node.center:
+                # every interval here ends at or after the center
+                end = bisect_right(node.lows, value)
+                candidates = node.by_low[:end]
+                node = node.left
+            elif value > node.center:
+                candidates = []
+                for interval in node.by_high:
+                    if interval[0].high_bound < value:
+                        break
+                    candidates.append(interval)
+                node = node.right
+            else:
+                candidates = node.by_low
+                node = None
+
+            for value_range, spec_id in candidates:
+                if value_range.matches(value):
+                    spec_ids.append(spec_id)
+
+
+class RangeIndex:
+    # centered interval tree over the subscribed ranges,
+    # rebuilt on the first lookup after a change
+    def __init__(self):
+        self.intervals: dict[int, Range] = {}
+        self.tree: _IntervalNode | None = None
+
+    def add(self, value_range: Range, spec_id: int):
+        self.intervals[spec_id] = value_range
+        self.tree = None
+
+    def discard(self, value_range: Range, spec_id: int):
+        self.intervals.pop(spec_id, None)
+        self.tree = None
+
+    def query(self, value) -> list[int]:
+        spec_ids = []
+        if not self.intervals:
+            return spec_ids
+
+        if self.tree is None:
+            self.tree = _IntervalNode(
+                [
+                    (value_range, spec_id)
+                    for spec_id, value_range in self.intervals.items()
+                ]
+            )
+        try:
+            self.tree.query(value, spec_ids)
+        except TypeError:  # not a number
+            return []
+        return spec_ids
+
+
+class AttributeIndex:
+    """
+    Compiled alternative to AttributeTrie with the same insert/remove/search api.
+    A subscribed spec is flattened once into (path, value) predicates, a value is either
+    a plain value or a SpecValue condition (AnyValue, OneOf, Prefix, Range).
+    An event matches the spec when all plain predicates are found in the event
+    and every condition holds for the event value at its path.
+    Each spec is indexed under its most selective predicate only (its anchor):
+    plain values and OneOf members in a dict, prefixes and ranges in a PrefixIndex
+    and a RangeIndex per path, so an event only checks the specs anchored on its own values.
+    Results are cached by event shape until the subscriptions change.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        # specs are referred to by an int id inside the index,
+        # so the hot path never hashes a spec
+        self.spec_ids: dict[AttributeProtocol, int] = {}
+        self.specs: dict[int, AttributeProtocol] = {}
+        self.next_spec_id = 0
+
+        self.spec_predicates: dict[int, frozenset[Predicate]] = {}
+        self.spec_conditions: dict[int, tuple[Predicate, ...]] = {}
+        self.spec_anchors: dict[int, Predicate] = {}
+        self.predicate_frequency: dict[Predicate, int] = {}
+
+        self.anchor_index: dict[Predicate, set[int]] = {}
+        self.prefix_indexes: dict[Path, PrefixIndex] = {}
+        self.range_indexes: dict[Path, RangeIndex] = {}
+        # specs checked for every event having the path (AnyValue, custom conditions)
+        self.path_index: dict[Path, set[int]] = {}
+
+        self.cache_size = cache_size
+        self.search_cache: dict[frozenset[Predicate], list[AttributeProtocol]] = {}
+
+    @staticmethod
+    def _frequency_keys(predicate: Predicate) -> list[Predicate]:
+        path, value = predicate
+        if isinstance(value, OneOf):
+            return [(path, member) for member in value.values]
+        return [predicate]
+
+    def _anchor_cost(self, predicate: Predicate) -> int:
+        # roughly how many specs an event carrying the value would have to check
+        value = predicate[1]
+        frequency = self.predicate_frequency
+        if isinstance(value, OneOf):
+            return sum(frequency[key] for key in self._frequency_keys(predicate))
+        if isinstance(value, (Prefix, Range)):
+            return frequency[predicate] + 1
+        if isinstance(value, SpecValue):
+            return frequency[predicate] + len(self.specs)
+        return frequency[predicate]
+
+    def _add_anchor(self, anchor: Predicate, spec_id: int):
+        path, value = anchor
+        if isinstance(value, OneOf):
+            for key in self._frequency_keys(anchor):
+                self.anchor_index.setdefault(key, set()).add(spec_id)
+        elif isinstance(value, Prefix):
+            prefix_index = self.prefix_indexes.setdefault(path, PrefixIndex())
+            prefix_index.add(value.prefix, spec_id)
+        elif isinstance(value, Range):
+            self.range_indexes.setdefault(path, RangeIndex()).add(value, spec_id)
+        elif isinstance(value, SpecValue):
+            self.path_index.setdefault(path, set()).add(spec_id)
+        else:
+            self.anchor_index.setdefault(anchor, set()).add(spec_id)
+
+    def _remove_anchor(self, anchor: Predicate, spec_id: int):
+        path, value = anchor
+        if isinstance(value, Prefix):
+            self.prefix_indexes[path].discard(value.prefix, spec_id)
+            return
+        if isinstance(value, Range):
+            self.range_indexes[path].discard(value, spec_id)
+            return
+
+        if isinstance(value, OneOf):
+            index, keys = self.anchor_index, self._frequency_keys(anchor)
+        elif isinstance(value, SpecValue):
+            index, keys = self.path_index, [path]
+        else:
+            index, keys = self.anchor_index, [anchor]
+
+        for key in keys:
+            spec_ids = index[key]
+            spec_ids.discard(spec_id)
+            if not spec_ids:
+                del index[key]
+
+    def insert(self, data: AttributeProtocol):
+        if data in self.spec_ids:
+            return
+
+        predicates = frozenset(flatten_spec(data))
+        if not predicates:
+            # nothing to match on, same as AttributeTrie
+            return
+
+        spec_id = self.next_spec_id
+        self.next_spec_id += 1
+        self.spec_ids[data] = spec_id
+        self.specs[spec_id] = data
+
+        conditions = tuple(p for p in predicates if isinstance(p[1], SpecValue))
+        self.spec_predicates[spec_id] = predicates.difference(conditions)
+        self.spec_conditions[spec_id] = conditions
+
+        predicate_frequency = self.predicate_frequency
+        for predicate in predicates:
+            for key in self._frequency_keys(predicate):
+                predicate_frequency[key] = predicate_frequency.get(key, 0) + 1
+
+        anchor = min(predicates, key=self._anchor_cost)
+        self.spec_anchors[spec_id] = anchor
+        self._add_anchor(anchor, spec_id)
+
+        self.search_cache.clear()
+
+    def remove(self, data: AttributeProtocol):
+        spec_id = self.spec_ids.pop(data, None)
+        if spec_id is None:
+            return
+
+        predicates = self.spec_predicates.pop(spec_id).union(
+            self.spec_conditions.pop(spec_id)
+        )
+        predicate_frequency = self.predicate_frequency
+        for predicate in predicates:
+            for key in self._frequency_keys(predicate):
+                predicate_frequency[key] -= 1
+                if not predicate_frequency[key]:
+                    del predicate_frequency[key]
+
+        self._remove_anchor(self.spec_anchors.pop(spec_id), spec_id)
+
+        del self.specs[spec_id]
+        self.search_cache.clear()
+
+    def search(self, data: AttributeProtocol) -> list[AttributeProtocol]:
+        event_predicates = frozenset(flatten_spec(data))
+
+        search_result = self.search_cache.get(event_predicates)
+        if search_result is not None:
+            return search_result
+
+        candidates = []
+        anchor_index = self.anchor_index
+        prefix_indexes = self.prefix_indexes
+        range_indexes = self.range_indexes
+        path_index = self.path_index
+        for predicate in event_predicates:
+            spec_ids = anchor_index.get(predicate)
+            if spec_ids:
+                candidates.extend(spec_ids)
+
+            path, value = predicate
+            prefix_index = prefix_indexes.get(path)
+            if prefix_index is not None and isinstance(value, str):
+                candidates.extend(prefix_index.query(value))
+
+            range_index = range_indexes.get(path)
+            if range_index is not None:
+                candidates.extend(range_index.query(value))
+
+            spec_ids = path_index.get(path)
+            if spec_ids:
+                candidates.extend(spec_ids)
+
+        search_result = []
+        event_values = dict(event_predicates) if candidates else {}
+        spec_predicates = self.spec_predicates
+        spec_conditions = self.spec_conditions
+        for spec_id in candidates:
+            if not spec_predicates[spec_id] <= event_predicates:
+                continue
+
+            conditions = spec_conditions[spec_id]
+            if conditions and not all(
+                value.matches(event_values.get(path)) for path, value in conditions
+            ):
+                continue
+
+            search_result.append(self.specs[spec_id])
+
+        if len(self.search_cache) >= self.cache_size:
+            self.search_cache.clear()
+        self.search_cache[event_predicates] = search_result
+        return search_result
+
+    def __len__(self):
+        return len(self.specs)
@@ -3,6 +3,7 @@
 from dataclasses import dataclass
 from collections import defaultdict
 from open_library.base_spec.base_spec import AttributeProtocol
+from open_library.observe.spec_value import SpecValue
 
 
 @dataclass
@@ -38,6 +39,11 @@ class AttributeTrie:
 
                 self._insert(attr_value, node_next, key, remove=remove)
         else:
+            if isinstance(data, SpecValue):
+                raise ValueError(
+                    f"{data!r} needs AttributeIndex, trie matches exact values"
+                )
+
             if data not in node:
                 node[data] = {}
 
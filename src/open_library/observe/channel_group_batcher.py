@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any
+
+from open_library.api_client.metrics import Histogram
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GroupBatchStats:
+    batches: int = 0
+    messages: int = 0
+    max_batch_size: int = 0
+    send_errors: int = 0
+    # first buffered message to the group_send
+    flush_latency: Histogram = field(default_factory=Histogram)
+
+    def snapshot(self) -> dict:
+        return dict(
+            batches=self.batches,
+            messages=self.messages,
+            mean_batch_size=self.messages / self.batches if self.batches else 0.0,
+            max_batch_size=self.max_batch_size,
+            send_errors=self.send_errors,
+            flush_latency=self.flush_latency.snapshot(),
+        )
+
+
+class ChannelGroupBatcher:
+    """
+    Buffers ChannelGroup messages per group and sends them with one group_send,
+    after flush_interval_sec or once max_batch_size messages are buffered.
+    A batch goes out as {"type": "task_message_batch", "messages": [...]},
+    a single message keeps the {"type": "task_message", "message": ...} form,
+    so consumers need a task_message_batch handler as well.
+    """
+
+    def __init__(
+        self,
+        channel_layer: Any = None,
+        flush_interval_sec: float = 0.05,
+        max_batch_size: int = 100,
+    ):
+        self.channel_layer = channel_layer
+        self.flush_interval_sec = flush_interval_sec
+        self.max_batch_size = max_batch_size
+
+        self.buffers: dict[str, list] = {}
+        self.first_buffered_at: dict[str, float] = {}
+        self.flush_tasks: dict[str, asyncio.Task] = {}
+        self.stats: dict[str, GroupBatchStats] = {}
+
+    def _get_channel_layer(self):
+        if self.channel_layer is None:
+            from channels.layers import get_channel_layer
+
+            self.channel_layer = get_channel_layer()
+        return self.channel_layer
+
+    async def send(self, group_name: str, message):
+        buffer = self.buffers.get(group_name)
+        if buffer is None:
+            buffer = self.buffers[group_name] = []
+            self.first_buffered_at[group_name] = time.monotonic()
+        buffer.append(message)
+
+        if len(buffer) >= self.max_batch_size:
+            await self.flush(group_name)
+        elif group_name not in self.flush_tasks:
+            self.flush_tasks[group_name] = asyncio.create_task(
+                self._flush_later(group_name)
+            )
+
+    async def _flush_later(self, group_name: str):
+        await asyncio.sleep(self.flush_interval_sec)
+        await self.flush(group_name)
+
+    async def flush(self, group_name: str):
+        task = self.flush_tasks.pop(group_name, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+        messages = self.buffers.pop(group_name, None)
+        if not messages:
+            return
+        buffered_at = self.first_buffered_at.pop(group_name)
+
+        if len(messages) == 1:
+            event = {"type": "task_message", "message": messages[0]}
+        else:
+            event = {"type": "task_message_batch", "messages": messages}
+
+        stats = self.stats.get(group_name)
+        if stats is None:
+            stats = self.stats[group_name] = GroupBatchStats()
+
+        try:
+            await self._get_channel_layer().group_send(group_name, event)
+        except Exception as e:
+            stats.send_errors += 1
+            logger.exception(f"group_send failed, group: {group_name}, {e}")
+            return
+
+        stats.batches += 1
+        stats.messages += len(messages)
+        stats.max_batch_size = max(stats.max_batch_size, len(messages))
+        stats.flush_latency.record(time.monotonic() - buffered_at)
+
+    async def close(self):
+        # flush what is buffered, e.g. on shutdown
+        for group_name in list(self.buffers):
+            await self.flush(group_name)
+
+    def get_stats(self) -> dict:
+        return {
+            group_name: stats.snapshot() for group_name, stats in self.stats.items()
+        }
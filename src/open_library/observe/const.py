@@ -6,3 +6,15 @@ class ListenerType(str, Enum):
     Callable = "callable"
     ChannelGroup = "channel_group"
     Service = "service"
+
+
+class DispatchStrategy(str, Enum):
+    Sequential = "sequential"
+    Gather = "gather"
+    Worker = "worker"
+
+
+class BackpressurePolicy(str, Enum):
+    Block = "block"
+    DropOldest = "drop_oldest"
+    Reject = "reject"
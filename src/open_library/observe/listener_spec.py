@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-from typing import Any, Callable, ClassVar, Coroutine
+from functools import partial
+from typing import Any, Awaitable, Callable, ClassVar, Coroutine
 
 from open_library.locator.service_locator import ServiceKey
 from open_library.observe.const import ListenerType
@@ -7,6 +8,9 @@ from open_library.base_spec.base_spec import BaseSpec
 from channels.layers import get_channel_layer
 from open_library.asynch.util import wrap_func_in_coro
 
+# resolved listener kept in __dict__, with the locator state it was resolved against
+LISTENER_CACHE = "_listener_cache"
+
 
 class ListenerSpec(BaseSpec):
     service_key: ServiceKey | None = None
@@ -15,30 +19,63 @@ class ListenerSpec(BaseSpec):
     listener_or_name: Callable | str
 
     service_locator: ClassVar[Any | None] = None
+    # ChannelGroupBatcher, when set ChannelGroup messages are sent in batches
+    channel_group_batcher: ClassVar[Any | None] = None
+    instance_cache_names: ClassVar[tuple[str, ...]] = BaseSpec.instance_cache_names + (
+        LISTENER_CACHE,
+    )
 
     @classmethod
     def set_service_locator(cls, service_locator):
         cls.service_locator = service_locator
 
-    def get_listener_coroutine(self, message) -> Coroutine[Any, Any, None]:
+    @classmethod
+    def set_channel_group_batcher(cls, channel_group_batcher):
+        cls.channel_group_batcher = channel_group_batcher
+
+    def resolve_listener(self) -> Callable[[Any], Awaitable[None]] | None:
         match self.listener_type:
             case ListenerType.Callable:
                 listener = self.listener_or_name
-                coroutine = wrap_func_in_coro(listener)
-                return coroutine(message)
+                return wrap_func_in_coro(listener)
             case ListenerType.Service:
                 service_key = self.service_key
 
                 service = self.service_locator.get_service(service_key)
                 listener = getattr(service, self.listener_or_name)
-                coroutine = wrap_func_in_coro(listener)
-                return coroutine(message)
+                return wrap_func_in_coro(listener)
 
             case ListenerType.ChannelGroup:
-                channel_layer = get_channel_layer()
                 group_name = self.listener_or_name
-                return channel_layer.group_send(
+                if self.channel_group_batcher is not None:
+                    return partial(self.channel_group_batcher.send, group_name)
+
+                channel_layer = get_channel_layer()
+                return lambda message: channel_layer.group_send(
                     group_name, {"type": "task_message", "message": message}
                 )
 
         return None
+
+    def get_listener(self) -> Callable[[Any], Awaitable[None]] | None:
+        # resolved once, again only after a service was re-registered or the batcher changed
+        service_locator = self.service_locator
+        cache_key = (
+            service_locator,
+            getattr(service_locator, "generation", 0),
+            self.channel_group_batcher,
+        )
+
+        cached = self.__dict__.get(LISTENER_CACHE)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+
+        listener = self.resolve_listener()
+        self.__dict__[LISTENER_CACHE] = (cache_key, listener)
+        return listener
+
+    def get_listener_coroutine(self, message) -> Coroutine[Any, Any, None]:
+        listener = self.get_listener()
+        if listener is None:
+            return None
+        return listener(message)
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+from typing import Any, Awaitable, Callable
+
+from open_library.asynch.queue_worker import QueueWorker
+from open_library.observe.listener_spec import ListenerSpec
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ListenerWorker(QueueWorker):
+    # one bounded queue and task per listener, a slow listener only delays itself,
+    # when it falls behind the oldest messages are dropped
+    def __init__(
+        self,
+        listener_spec: ListenerSpec,
+        call_listener: Callable[[ListenerSpec, Any], Awaitable[None]],
+        maxsize: int = 1000,
+    ):
+        super().__init__(maxsize)
+        self.listener_spec = listener_spec
+        self.call_listener = call_listener
+
+    async def handle(self, message):
+        # call_listener isolates errors and applies the timeout
+        await self.call_listener(self.listener_spec, message)
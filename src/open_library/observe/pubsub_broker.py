@@ -1,27 +1,59 @@
 #!/usr/bin/env python3
 
+import time
 from functools import singledispatchmethod
 from typing import Callable
 
 from open_library.observe.listener_spec import ListenerSpec
 from open_investing.event_spec.event_spec import EventSpec
 import asyncio
-from open_library.observe.const import ListenerType
+from open_library.observe.const import BackpressurePolicy, ListenerType
 from open_library.observe.listener_spec import ListenerSpec
 
 from open_library.observe.subscription_manager import SubscriptionManager
+from open_library.observe.pubsub_transport import PubsubTransport
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class PubsubBroker:
-    def __init__(self):
-        self.subscription_manager = SubscriptionManager()
+    """
+    Messages are sharded over worker_count queues by their event spec,
+    so messages of the same spec keep their order while different specs run in parallel.
+    A worker drains up to batch_size queued messages at once and matches them together.
+    With max_queue_size (per worker) the queues are bounded and backpressure_policy
+    decides what enqueue_message does when a queue is full:
+    Block waits, DropOldest drops the oldest queued message, Reject raises asyncio.QueueFull.
+    With a transport, enqueued messages are also sent to the brokers of the other
+    processes connected to the same PubsubHub.
+    """
 
-        self.queue = asyncio.Queue()
+    def __init__(
+        self,
+        subscription_manager: SubscriptionManager | None = None,
+        worker_count: int = 1,
+        max_queue_size: int = 0,
+        backpressure_policy: BackpressurePolicy = BackpressurePolicy.Block,
+        batch_size: int = 1,
+        transport: PubsubTransport | None = None,
+    ):
+        self.subscription_manager = subscription_manager or SubscriptionManager()
+        self.transport = transport
+
+        self.queues = [asyncio.Queue(max_queue_size) for _ in range(worker_count)]
+        self.backpressure_policy = BackpressurePolicy(backpressure_policy)
+        self.batch_size = batch_size
         self.running = False
-        self.run_task = None
+        self.run_tasks: list[asyncio.Task] = []
+
+        self.enqueued_count = 0
+        self.dropped_count = 0
+        self.rejected_count = 0
+        self.processed_count = 0
+        self.batch_count = 0
+        self.last_stats_at = time.monotonic()
+        self.last_stats_processed = 0
 
     def subscribe(self, event_spec: EventSpec, listener_spec: ListenerSpec):
         self.subscription_manager.subscribe(event_spec, listener_spec)
@@ -30,21 +62,95 @@ class PubsubBroker:
         self.subscription_manager.unsubscribe(event_spec, listener_spec)
 
     def init(self):
-        self.run_task = asyncio.create_task(self.run())
+        self.running = True
+        self.run_tasks = [
+            asyncio.create_task(self.run(worker_index))
+            for worker_index in range(len(self.queues))
+        ]
+        if self.transport is not None:
+            self.transport.start(self.enqueue_remote_message)
 
-    async def run(self):
+    async def run(self, worker_index: int = 0):
+        queue = self.queues[worker_index]
         self.running = True
         while self.running:
             try:
-                message = await self.queue.get()
-                await self.subscription_manager.publish(message)
+                messages = [await queue.get()]
+                while len(messages) < self.batch_size and not queue.empty():
+                    messages.append(queue.get_nowait())
+
+                await self.subscription_manager.publish_many(messages)
                 # rate limiting
 
+                self.processed_count += len(messages)
+                self.batch_count += 1
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.exception(f"broker run: {e}")
 
     def stop_processing(self):
         self.running = False
 
+    async def stop(self):
+        self.running = False
+        for task in self.run_tasks:
+            task.cancel()
+        await asyncio.gather(*self.run_tasks, return_exceptions=True)
+        self.run_tasks = []
+
+        if self.transport is not None:
+            await self.transport.close()
+
+    def _get_queue(self, message: dict) -> asyncio.Queue:
+        if len(self.queues) == 1:
+            return self.queues[0]
+        return self.queues[hash(message["event_spec"]) % len(self.queues)]
+
     async def enqueue_message(self, message: dict):
-        await self.queue.put(message)
+        await self.enqueue_local_message(message)
+        if self.transport is not None:
+            await self.transport.publish(message)
+
+    async def enqueue_remote_message(self, message: dict):
+        # from another process, it was already sent out there
+        await self.enqueue_local_message(message)
+
+    async def enqueue_local_message(self, message: dict):
+        queue = self._get_queue(message)
+
+        if queue.full():
+            match self.backpressure_policy:
+                case BackpressurePolicy.DropOldest:
+                    queue.get_nowait()
+                    self.dropped_count += 1
+                case BackpressurePolicy.Reject:
+                    self.rejected_count += 1
+                    raise asyncio.QueueFull(
+                        f"broker queue is full, size: {queue.maxsize}"
+                    )
+
+        self.enqueued_count += 1
+        await queue.put(message)
+
+    def get_stats(self) -> dict:
+        # throughput is measured since the previous get_stats call
+        now = time.monotonic()
+        elapsed = now - self.last_stats_at
+        processed = self.processed_count - self.last_stats_processed
+        self.last_stats_at = now
+        self.last_stats_processed = self.processed_count
+
+        return dict(
+            queue_depths=[queue.qsize() for queue in self.queues],
+            enqueued=self.enqueued_count,
+            dropped=self.dropped_count,
+            rejected=self.rejected_count,
+            processed=self.processed_count,
+            batches=self.batch_count,
+            mean_batch_size=(
+                self.processed_count / self.batch_count if self.batch_count else 0.0
+            ),
+            throughput_per_sec=processed / elapsed if elapsed > 0 else 0.0,
+        )
@@ -2,23 +2,116 @@
 
 
 import asyncio
+import inspect
+import weakref
+from typing import Callable
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """
+    One listener of a key.
+    weak: the broker doesn't keep the listener alive, it is unsubscribed when collected
+    inline: called directly in publish instead of in a task of its own
+    coalesce: while the listener is busy only the latest message is kept, stale ones are skipped
+    """
+
+    __slots__ = ("listener_ref", "inline", "coalesce", "latest", "has_latest", "task")
+
+    def __init__(
+        self,
+        listener: Callable,
+        weak: bool = False,
+        inline: bool = False,
+        coalesce: bool = False,
+        on_collected: Callable | None = None,
+    ):
+        if not weak:
+            self.listener_ref = lambda: listener
+        elif inspect.ismethod(listener):
+            self.listener_ref = weakref.WeakMethod(listener, on_collected)
+        else:
+            self.listener_ref = weakref.ref(listener, on_collected)
+
+        self.inline = inline
+        self.coalesce = coalesce
+        self.latest = None
+        self.has_latest = False
+        self.task = None
+
+    def offer(self, message) -> asyncio.Task | None:
+        # keep the latest message, start a delivery task unless one is running
+        self.latest = message
+        self.has_latest = True
+        if self.task is None:
+            self.task = asyncio.create_task(self._deliver_latest())
+            return self.task
+        return None
+
+    async def _deliver_latest(self):
+        try:
+            while self.has_latest:
+                message = self.latest
+                self.latest = None
+                self.has_latest = False
+
+                listener = self.listener_ref()
+                if listener is None:
+                    return
+                try:
+                    await listener(message)
+                except Exception as e:
+                    logger.exception(f"listener failed: {listener}, {e}")
+                del listener
+        finally:
+            self.task = None
 
 
 class PubsubBroker:
     def __init__(self):
-        self.subscribers: dict[str, set] = {}
+        # key -> tuple of subscribers, replaced on change (copy on write)
+        # so publish iterates a snapshot that unsubscribe can't mutate
+        self.subscribers: dict[str, tuple[Subscriber, ...]] = {}
         self.queue = asyncio.Queue()
         self.running = False
         self.running_tasks = set()
 
-    def subscribe(self, key: str, listener):
-        if key not in self.subscribers:
-            self.subscribers[key] = set()
-        self.subscribers[key].add(listener)
+    def subscribe(
+        self,
+        key: str,
+        listener,
+        weak: bool = False,
+        inline: bool = False,
+        coalesce: bool = False,
+    ):
+        subscribers = self.subscribers.get(key, ())
+        if any(subscriber.listener_ref() == listener for subscriber in subscribers):
+            return
+
+        subscriber = None
+
+        def on_collected(_):
+            self._remove_subscriber(key, subscriber)
+
+        subscriber = Subscriber(listener, weak, inline, coalesce, on_collected)
+        self.subscribers[key] = subscribers + (subscriber,)
 
     def unsubscribe(self, key: str, listener):
-        if key in self.subscribers:
-            self.subscribers[key].remove(listener)
+        for subscriber in self.subscribers.get(key, ()):
+            if subscriber.listener_ref() == listener:
+                self._remove_subscriber(key, subscriber)
+                return
+
+    def _remove_subscriber(self, key: str, subscriber: Subscriber):
+        subscribers = self.subscribers.get(key, ())
+        remaining = tuple(s for s in subscribers if s is not subscriber)
+        if remaining:
+            self.subscribers[key] = remaining
+        else:
+            self.subscribers.pop(key, None)
 
     async def start_processing(self):
         self.running = True
@@ -32,10 +125,26 @@ class PubsubBroker:
     async def enqueue_message(self, key: str, message):
         await self.queue.put((key, message))
 
+    def _track(self, task: asyncio.Task):
+        self.running_tasks.add(task)
+        task.add_done_callback(self.running_tasks.discard)
+
     async def publish(self, key: str, message):
-        if key in self.subscribers:
-            for listener in self.subscribers[key]:
-                task = asyncio.create_task(listener(message))
+        for subscriber in self.subscribers.get(key, ()):
+            listener = subscriber.listener_ref()
+            if listener is None:
+                continue  # collected, on_collected removes it
 
-                self.running_tasks.add(task)
-                task.add_done_callback(lambda t: self.running_tasks.remove(t))
+            if subscriber.coalesce:
+                task = subscriber.offer(message)
+                if task is not None:
+                    self._track(task)
+            elif subscriber.inline:
+                try:
+                    result = listener(message)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.exception(f"listener failed: {listener}, {e}")
+            else:
+                self._track(asyncio.create_task(listener(message)))
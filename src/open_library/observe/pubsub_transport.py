@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import os
+import asyncio
+import pickle
+import socket
+import struct
+from typing import Any, Awaitable, Callable
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# frame: 4 byte big endian payload length, payload
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+RECONNECT_DELAY_SEC = 1.0
+
+
+def default_encode(message: Any) -> bytes:
+    # event specs are pydantic models, pickle keeps their classes
+    return pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def default_decode(payload: bytes) -> Any:
+    return pickle.loads(payload)
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"frame too large: {size}")
+    return await reader.readexactly(size)
+
+
+class PubsubHub:
+    """
+    Relays frames between the processes of one host over a unix domain socket.
+    A frame from one peer is written as is to every other peer, it is never decoded here.
+    A peer that doesn't keep up loses frames instead of stalling the others.
+    """
+
+    def __init__(self, path: str, max_peer_buffer_bytes: int = 8 * 1024 * 1024):
+        self.path = path
+        self.max_peer_buffer_bytes = max_peer_buffer_bytes
+        self.server: asyncio.AbstractServer | None = None
+        self.peers: set[asyncio.StreamWriter] = set()
+        self.peer_tasks: set[asyncio.Task] = set()
+
+        self.relayed_count = 0
+        self.dropped_count = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from a previous run
+
+        # messages are pickled, only the owner may connect,
+        # the socket file is created 0600, the umask is changed only around the bind
+        # (no await in between, it is process wide)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            old_umask = os.umask(0o177)
+            try:
+                sock.bind(self.path)
+            finally:
+                os.umask(old_umask)
+
+            self.server = await asyncio.start_unix_server(self._handle_peer, sock=sock)
+        except BaseException:
+            sock.close()
+            raise
+
+    async def _handle_peer(self, reader, writer):
+        task = asyncio.current_task()
+        self.peer_tasks.add(task)
+        self.peers.add(writer)
+        try:
+            while True:
+                frame = encode_frame(await read_frame(reader))
+                for peer in self.peers:
+                    if peer is writer:
+                        continue
+
+                    if (
+                        peer.transport.get_write_buffer_size()
+                        > self.max_peer_buffer_bytes
+                    ):
+                        self.dropped_count += 1
+                        continue
+                    peer.write(frame)
+                self.relayed_count += 1
+        except asyncio.IncompleteReadError:
+            pass  # peer closed
+        except Exception as e:
+            logger.exception(f"pubsub hub peer: {e}")
+        finally:
+            self.peers.discard(writer)
+            self.peer_tasks.discard(task)
+            writer.close()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            # closing the connections ends the peer handlers with an incomplete read
+            peer_tasks = list(self.peer_tasks)
+            for writer in list(self.peers):
+                writer.close()
+            await asyncio.gather(*peer_tasks, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def get_stats(self) -> dict:
+        return dict(
+            peers=len(self.peers),
+            relayed=self.relayed_count,
+            dropped=self.dropped_count,
+        )
+
+
+class PubsubTransport:
+    """
+    Connection of one process to a PubsubHub.
+    Published messages go to every other connected process,
+    received ones are passed to on_message (e.g. PubsubBroker.enqueue_remote_message).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        encode: Callable[[Any], bytes] = default_encode,
+        decode: Callable[[bytes], Any] = default_decode,
+    ):
+        self.path = path
+        self.encode = encode
+        self.decode = decode
+
+        self.writer: asyncio.StreamWriter | None = None
+        self.on_message: Callable[[Any], Awaitable[None]] | None = None
+        self.receive_task = None
+        self.running = False
+
+        self.sent_count = 0
+        self.received_count = 0
+        self.unsent_count = 0
+
+    def start(self, on_message: Callable[[Any], Awaitable[None]]):
+        self.on_message = on_message
+        self.running = True
+        if self.receive_task is None:
+            self.receive_task = asyncio.create_task(self.receive_loop())
+
+    async def receive_loop(self):
+        while self.running:
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path)
+                logger.info(f"pubsub transport connected: {self.path}")
+
+                while True:
+                    message = self.decode(await read_frame(reader))
+                    self.received_count += 1
+                    try:
+                        await self.on_message(message)
+                    except Exception as e:
+                        logger.exception(f"pubsub transport handling: {e}")
+
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.IncompleteReadError) as e:
+                logger.warning(f"pubsub transport disconnected: {self.path}, {e}")
+            except Exception as e:
+                # undecodable or oversized frame, the stream can't be trusted past it
+                logger.exception(f"pubsub transport receive failed: {self.path}, {e}")
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+                    self.writer = None
+
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    async def publish(self, message: Any):
+        writer = self.writer
+        if writer is None:
+            # not connected, other processes miss this one
+            self.unsent_count += 1
+            return
+
+        writer.write(encode_frame(self.encode(message)))
+        self.sent_count += 1
+        await writer.drain()
+
+    async def close(self):
+        self.running = False
+        if self.receive_task is not None:
+            self.receive_task.cancel()
+            try:
+                await self.receive_task
+            except asyncio.CancelledError:
+                pass
+            self.receive_task = None
+
+    def get_stats(self) -> dict:
+        return dict(
+            connected=self.writer is not None,
+            sent=self.sent_count,
+            received=self.received_count,
+            unsent=self.unsent_count,
+        )
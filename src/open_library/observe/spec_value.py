@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import abc
+import math
+from typing import Any, Hashable
+
+from pydantic import BaseModel, ConfigDict, model_validator
+
+
+class SpecValue(BaseModel):
+    """
+    A condition used in place of a plain value in a subscribed spec,
+    e.g. QuoteSpec(security_code=Prefix(prefix="KR")).
+    The spec field has to allow it: security_code: str | Prefix | None
+    Matched with AttributeIndex, AttributeTrie only does exact values.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    @abc.abstractmethod
+    def matches(self, value: Any) -> bool:
+        pass
+
+
+class AnyValue(SpecValue):
+    # the event has some non empty value for the attribute
+    def matches(self, value: Any) -> bool:
+        return bool(value)
+
+
+class OneOf(SpecValue):
+    values: frozenset[Hashable]
+
+    def matches(self, value: Any) -> bool:
+        return value in self.values
+
+
+class Prefix(SpecValue):
+    prefix: str
+
+    def matches(self, value: Any) -> bool:
+        return isinstance(value, str) and value.startswith(self.prefix)
+
+
+class Range(SpecValue):
+    # [low, high) by default, None is unbounded
+    low: float | None = None
+    high: float | None = None
+    low_inclusive: bool = True
+    high_inclusive: bool = False
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.low_bound > self.high_bound:
+            raise ValueError(f"low is above high: {self.low} > {self.high}")
+        return self
+
+    @property
+    def low_bound(self) -> float:
+        return -math.inf if self.low is None else self.low
+
+    @property
+    def high_bound(self) -> float:
+        return math.inf if self.high is None else self.high
+
+    def matches(self, value: Any) -> bool:
+        low, high = self.low_bound, self.high_bound
+        try:
+            if value < low or (value == low and not self.low_inclusive):
+                return False
+            if value > high or (value == high and not self.high_inclusive):
+                return False
+        except TypeError:  # not a number
+            return False
+        return True
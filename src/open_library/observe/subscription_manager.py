@@ -1,20 +1,52 @@
 #!/usr/bin/env python3
 
 
-from open_library.observe.const import ListenerType
+from open_library.observe.const import DispatchStrategy, ListenerType
 from typing import Callable
 import asyncio
 from collections import defaultdict
 from open_library.observe.attribute_trie import AttributeTrie, AttributeProtocol
+from open_library.observe.attribute_index import AttributeIndex
 from open_library.observe.listener_spec import ListenerSpec
+from open_library.observe.listener_worker import ListenerWorker
+
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class SubscriptionManager:
-    def __init__(self):
-        self.attribute_trie = AttributeTrie()
+    def __init__(
+        self,
+        attribute_trie: AttributeTrie | AttributeIndex | None = None,
+        dispatch_strategy: DispatchStrategy = DispatchStrategy.Sequential,
+        max_concurrency: int | None = None,
+        listener_timeout_sec: float | None = None,
+        worker_queue_size: int = 1000,
+    ):
+        # AttributeIndex is the compiled matcher, AttributeTrie is still accepted
+        self.attribute_trie = (
+            attribute_trie if attribute_trie is not None else AttributeIndex()
+        )
         self.listeners = defaultdict(list)
         self.running_tasks = set()
 
+        # Sequential: await listeners one by one
+        # Gather: run listeners concurrently (at most max_concurrency), wait for all
+        # Worker: hand the message to a queue per listener and return
+        self.dispatch_strategy = DispatchStrategy(dispatch_strategy)
+        self.listener_timeout_sec = listener_timeout_sec
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.worker_queue_size = worker_queue_size
+
+        self.workers: dict[ListenerSpec, ListenerWorker] = {}
+        # number of event specs each listener is subscribed to
+        self.listener_subscription_counts: dict[ListenerSpec, int] = defaultdict(int)
+
+        self.notified_count = 0
+        self.error_count = 0
+        self.timeout_count = 0
+
     def subscribe(
         self, event_spec: AttributeProtocol, listener_spec: ListenerSpec | Callable
     ):
@@ -25,10 +57,12 @@ class SubscriptionManager:
                 listener_or_name=listener,
             )
 
-        self.attribute_trie.insert(event_spec)
         # self.listeners[hash(event_spec)].append(listener_spec)
+        if not self.listeners[event_spec]:
+            self.attribute_trie.insert(event_spec)
         if listener_spec not in self.listeners[event_spec]:
             self.listeners[event_spec].append(listener_spec)
+            self.listener_subscription_counts[listener_spec] += 1
 
     def unsubscribe(
         self, event_spec: AttributeProtocol, listener_spec: ListenerSpec | Callable
@@ -40,24 +74,92 @@ class SubscriptionManager:
                 listener_or_name=listener,
             )
 
-        self.attribute_trie.remove(event_spec)
         # self.listeners[hash(event_spec)].remove(listener_spec)
         self.listeners[event_spec].remove(listener_spec)
+        # keep the spec indexed while other listeners still use it
+        if not self.listeners[event_spec]:
+            del self.listeners[event_spec]
+            self.attribute_trie.remove(event_spec)
+
+        self.listener_subscription_counts[listener_spec] -= 1
+        if not self.listener_subscription_counts[listener_spec]:
+            del self.listener_subscription_counts[listener_spec]
+            worker = self.workers.pop(listener_spec, None)
+            if worker is not None:
+                # a listener unsubscribing itself still finishes its current call
+                worker.cancel()
+
+    async def _call_listener(self, listener_spec: ListenerSpec, message):
+        # a failing or slow listener doesn't affect the others
+        self.notified_count += 1
+        try:
+            listener_coro = listener_spec.get_listener_coroutine(message)
+            if listener_coro is None:
+                return
+
+            if self.listener_timeout_sec is None:
+                await listener_coro
+            else:
+                await asyncio.wait_for(listener_coro, self.listener_timeout_sec)
+        except asyncio.TimeoutError:
+            self.timeout_count += 1
+            logger.warning(
+                f"listener timed out after {self.listener_timeout_sec}s: {listener_spec.listener_or_name}"
+            )
+        except Exception as e:
+            self.error_count += 1
+            logger.exception(f"listener failed: {listener_spec.listener_or_name}, {e}")
+
+    async def _call_listener_limited(self, listener_spec: ListenerSpec, message):
+        async with self.semaphore:
+            await self._call_listener(listener_spec, message)
+
+    def _get_worker(self, listener_spec: ListenerSpec) -> ListenerWorker:
+        worker = self.workers.get(listener_spec)
+        if worker is None:
+            worker = ListenerWorker(
+                listener_spec, self._call_listener, maxsize=self.worker_queue_size
+            )
+            self.workers[listener_spec] = worker
+            worker.start()
+        return worker
 
     async def notify_listeners(self, matching_event_specs, message):
         """
         Notify all listeners subscribed to the matching event specs.
         """
-        for spec in matching_event_specs:
+        listener_specs = [
+            listener_spec
+            for spec in matching_event_specs
             # for listener_spec in self.listeners[hash(spec)]:
-            for listener_spec in self.listeners[spec]:
-                listener_coro = listener_spec.get_listener_coroutine(message)
-                await listener_coro
+            for listener_spec in self.listeners.get(spec, [])
+        ]
+        if not listener_specs:
+            return
 
-                # task = asyncio.create_task(listener_coro)
+        match self.dispatch_strategy:
+            case DispatchStrategy.Sequential:
+                for listener_spec in listener_specs:
+                    await self._call_listener(listener_spec, message)
 
-                # self.running_tasks.add(task)
-                # task.add_done_callback(lambda t: self.running_tasks.remove(t))
+            case DispatchStrategy.Gather:
+                call_listener = (
+                    self._call_listener_limited
+                    if self.semaphore
+                    else self._call_listener
+                )
+                tasks = []
+                for listener_spec in listener_specs:
+                    task = asyncio.create_task(call_listener(listener_spec, message))
+                    self.running_tasks.add(task)
+                    task.add_done_callback(self.running_tasks.discard)
+                    tasks.append(task)
+
+                await asyncio.gather(*tasks)
+
+            case DispatchStrategy.Worker:
+                for listener_spec in listener_specs:
+                    self._get_worker(listener_spec).put_nowait(message)
 
     async def publish(self, message):
         """
@@ -68,3 +170,38 @@ class SubscriptionManager:
 
         matching_event_specs = self.attribute_trie.search(event_spec)
         await self.notify_listeners(matching_event_specs, message)
+
+    async def publish_many(self, messages: list[dict]):
+        """
+        Publish a batch of events in order, each distinct event spec is matched once.
+        """
+        matches = {}
+        for message in messages:
+            event_spec = message["event_spec"]
+            matching_event_specs = matches.get(event_spec)
+            if matching_event_specs is None:
+                matching_event_specs = self.attribute_trie.search(event_spec)
+                matches[event_spec] = matching_event_specs
+
+            await self.notify_listeners(matching_event_specs, message)
+
+    def get_dispatch_stats(self) -> dict:
+        return dict(
+            notified=self.notified_count,
+            errors=self.error_count,
+            timeouts=self.timeout_count,
+            running_tasks=len(self.running_tasks),
+            workers=[
+                dict(listener=str(listener_spec.listener_or_name), **worker.get_stats())
+                for listener_spec, worker in self.workers.items()
+            ],
+        )
+
+    async def close(self):
+        workers = list(self.workers.values())
+        self.workers = {}
+        for worker in workers:
+            await worker.stop()
+
+        if self.running_tasks:
+            await asyncio.gather(*self.running_tasks, return_exceptions=True)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare AttributeTrie and AttributeIndex search time as the subscriber count grows.
+
+python -m open_library.scripts.bench_attribute_index
+"""
+
+import random
+import time
+
+from open_library.base_spec.base_spec import BaseSpec
+from open_library.observe.attribute_index import AttributeIndex
+from open_library.observe.attribute_trie import AttributeTrie
+
+
+class QuoteSpec(BaseSpec):
+    spec_type_name: str = "quote"
+    security_code: str | None = None
+    exchange: str | None = None
+
+
+def make_subscriptions(count: int) -> list[QuoteSpec]:
+    specs = [QuoteSpec()]  # all quotes
+    specs += [QuoteSpec(security_code=f"{i:06d}") for i in range(count - 1)]
+    return specs
+
+
+def make_events(count: int, code_count: int) -> list[QuoteSpec]:
+    return [
+        QuoteSpec(
+            security_code=f"{random.randrange(code_count):06d}",
+            exchange=random.choice(["KRX", "NXT"]),
+        )
+        for _ in range(count)
+    ]
+
+
+def bench(matcher, subscriptions, events) -> float:
+    for spec in subscriptions:
+        matcher.insert(spec)
+
+    started_at = time.perf_counter()
+    for event in events:
+        matcher.search(event)
+    return time.perf_counter() - started_at
+
+
+def main(event_count: int = 2000):
+    print(f"{'subscribers':>12} {'trie us/event':>14} {'index us/event':>15}")
+    for subscriber_count in [10, 100, 1000, 5000]:
+        subscriptions = make_subscriptions(subscriber_count)
+        events = make_events(event_count, subscriber_count)
+
+        trie_sec = bench(AttributeTrie(), subscriptions, events)
+        index_sec = bench(AttributeIndex(), subscriptions, events)
+
+        print(
+            f"{subscriber_count:>12} {trie_sec / event_count * 1e6:>14.1f} {index_sec / event_count * 1e6:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()